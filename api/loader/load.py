@@ -323,7 +323,7 @@ class Load:
         self.machine = repres["machine"]
         self.suite = repres["suite"]
         self.compact_timelogs = repres["compact_timelogs"]
-        self.spread_timelogs = repres["spread_timelogs"]
+        self.spread_timelogs = repres.get("spread_timelogs", [])
         self.coscheduled_timelogs = repres["coscheduled_timelogs"]
         self.dpops = repres["dpops"]
         self.bytes_transferred = repres["bytes_transferred"]
@@ -340,7 +340,7 @@ class Load:
         load.machine = repres["machine"]
         load.suite = repres["suite"]
         load.compact_timelogs = repres["compact_timelogs"]
-        load.spread_timelogs = repres["spread_timelogs"]
+        load.spread_timelogs = repres.get("spread_timelogs", [])
         load.coscheduled_timelogs = repres["coscheduled_timelogs"]
         load.dpops = repres["dpops"]
         load.bytes_transferred = repres["bytes_transferred"]
@@ -34,7 +34,7 @@ scheduler_hierarchy = import_class_hierarchy(os.path.abspath(os.path.join(os.pat
 from api.loader import LoadManager
 
 # Database
-from realsim.jobs.utils import deepcopy_list
+from realsim.jobs.utils import deepcopy_list, JobsStream
 from realsim.database import Database
 
 # Cluster
@@ -163,6 +163,8 @@ class BatchCreator:
             self.__schematic_inputs = self.config["inputs"]
             self.__schematic_schedulers = self.config["schedulers"]
             self.__schematic_actions = self.config["actions"] if "actions" in self.config else dict()
+            self.__schematic_compengine = self.config["compengine"] if "compengine" in self.config else dict()
+            self.__schematic_fork = self.config["fork"] if "fork" in self.config else dict()
 
     def get_sim_configs_num(self) -> int:
         logger.debug("Calculating the total number of simulation configurations")
@@ -279,6 +281,10 @@ class BatchCreator:
             # Create cluster
             nodes = int(input["cluster"]["nodes"])
             socket_conf = tuple(input["cluster"]["socket-conf"])
+            cluster_opts = {
+                "host_backend": input["cluster"].get("host-backend", "procset"),
+                "lazy_hosts": bool(input["cluster"].get("lazy-hosts", False)),
+            }
 
 
             # Create the input using the generator provided
@@ -303,6 +309,15 @@ class BatchCreator:
                 
                 for _ in range(repeat):
 
+                    # A streamed input is read lazily by every simulation
+                    # instead of being generated here as a whole
+                    if input.get("stream", False):
+                        if "distribution" in generator:
+                            raise RuntimeError("A distribution can't be applied to a streamed input")
+                        gen_input = JobsStream(gen_inst, gen_arg)
+                        self.__inputs.append((gen_input, heatmap, nodes, socket_conf, cluster_opts))
+                        continue
+
                     gen_input = gen_inst.generate_jobs_set(gen_arg)
                     # Generate the input
                     # if gen_type in ["List Generator","Shuffle List Generator"]:
@@ -339,7 +354,7 @@ class BatchCreator:
 
                         logger.debug(f"A distribution was applied to the input: {distr_inst.name}.")
                     
-                    self.__inputs.append((gen_input, heatmap, nodes, socket_conf))
+                    self.__inputs.append((gen_input, heatmap, nodes, socket_conf, cluster_opts))
 
             else:
                 raise RuntimeError("A generator was not provided")
@@ -456,6 +471,62 @@ class BatchCreator:
 
         logger.debug(f"Finished processing the postprocessing actions: {self.__extra_features}")
 
+    def __create_simulation(self, input, heatmap, nodes, socket_conf, cluster_opts, sched_cls, sched_opts) -> tuple:
+
+        # Create a database instance
+        if isinstance(input, JobsStream):
+            # Each simulation reads its own stream of jobs
+            database = Database(input, heatmap, lm=self.lm)
+        else:
+            database = Database(deepcopy_list(input), heatmap, lm=self.lm)
+        database.setup()
+
+        # Create a cluster instance
+        cluster = Cluster(nodes, socket_conf, **cluster_opts)
+
+        # Create a scheduler instance
+        scheduler = self.__create_scheduler(sched_cls, sched_opts)
+
+        # Create a logger instance
+        evt_logger = Logger(debug=False)
+
+        # Create a compute engine instance
+        compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
+        # Apply options to compute engine instance
+        for opt, val in self.__schematic_compengine.items():
+            compengine.__dict__[opt] = val
+        compengine.setup_preloaded_jobs()
+
+        return database, cluster, scheduler, evt_logger, compengine
+
+    def __create_scheduler(self, sched_cls, sched_opts) -> Scheduler:
+        scheduler = sched_cls()
+        # Apply options to scheduler instance
+        for opt, val in sched_opts:
+            scheduler.__dict__[opt] = val
+        return scheduler
+
+    def __create_warmup(self, input, heatmap, nodes, socket_conf, cluster_opts) -> ComputeEngine:
+        """Simulate the common prefix of an input once with the reference
+        scheduler so that every scheduler continues from a fork of it
+        """
+
+        warmup = float(self.__schematic_fork["warmup"])
+        ref_index = int(self.__schematic_fork.get("scheduler", 0))
+        _, sched_cls, sched_opts = self.__schedulers[ref_index]
+
+        _, cluster, scheduler, evt_logger, compengine = self.__create_simulation(input, heatmap, nodes, socket_conf, cluster_opts, sched_cls, sched_opts)
+        compengine.debug_logger = logger.getChild("compengine")
+
+        cluster.setup()
+        scheduler.setup()
+        evt_logger.setup()
+
+        logger.debug(f"Simulating the warm-up prefix of {warmup} seconds with {scheduler.name}")
+        compengine.simulate_until(warmup)
+
+        return compengine
+
     def create_ranks(self) -> None:
         self.process_inputs()
         self.process_schedulers()
@@ -466,28 +537,23 @@ class BatchCreator:
 
         # Create the ranks
         self.ranks = list()
-        for input_index, [input, heatmap, nodes, socket_conf] in enumerate(self.__inputs):
-            for [sched_index, sched_cls, sched_opts] in self.__schedulers:
-                
-                # Create a database instance
-                database = Database(deepcopy_list(input), heatmap, lm=self.lm)
-                database.setup()
-
-                # Create a cluster instance
-                cluster = Cluster(nodes, socket_conf)
+        for input_index, [input, heatmap, nodes, socket_conf, cluster_opts] in enumerate(self.__inputs):
 
-                # Create a scheduler instance
-                scheduler = sched_cls()
-                # Apply options to scheduler instance
-                for opt, val in sched_opts:
-                    scheduler.__dict__[opt] = val
+            # If a warm-up is defined then all the schedulers fork from it
+            warmup_compengine = None
+            if "warmup" in self.__schematic_fork:
+                warmup_compengine = self.__create_warmup(input, heatmap, nodes, socket_conf, cluster_opts)
 
-                # Create a logger instance
-                evt_logger = Logger(debug=False)
+            for [sched_index, sched_cls, sched_opts] in self.__schedulers:
 
-                # Create a compute engine instance
-                compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
-                compengine.setup_preloaded_jobs()
+                if warmup_compengine is not None:
+                    compengine = warmup_compengine.fork(self.__create_scheduler(sched_cls, sched_opts))
+                    database = compengine.db
+                    cluster = compengine.cluster
+                    scheduler = compengine.scheduler
+                    evt_logger = compengine.logger
+                else:
+                    database, cluster, scheduler, evt_logger, compengine = self.__create_simulation(input, heatmap, nodes, socket_conf, cluster_opts, sched_cls, sched_opts)
 
                 # Set actions for this simulation
                 actions = self.__actions[input_index][sched_index]
@@ -11,14 +11,15 @@ sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..")
 ))
 
+from realsim.compengine import ComputeEngine
+
 if TYPE_CHECKING:
     from realsim.database import Database
-    from realsim.compengine import ComputeEngine
     from realsim.cluster.cluster import Cluster
     from realsim.scheduler.scheduler import Scheduler
     from realsim.logger.logger import Logger
 
-from common.utils import define_logger, handler_and_formatter, envvar_bool_val, profiling_ctx
+from common.utils import define_logger, handler_and_formatter, envvar_bool_val, envvar_int_val, envvar_path_val, profiling_ctx
 from common.communication import create_tcp_socket, send_tcp_msg
 logger = define_logger()
 
@@ -253,22 +254,44 @@ def single_simulation(sim_batch, server_ipaddr, server_port, webui=False):
     extra_features: list
     sim_idx, inp_idx, sched_idx, database, cluster, scheduler, evt_logger, compengine, actions, extra_features = sim_batch
 
+    # Progress counter
+    total_jobs = database.preloaded_jobs_num() + len(cluster.waiting_queue) + len(cluster.execution_list)
+
+    # Snapshots of the simulation are taken periodically (in seconds) if an
+    # interval is provided by the user
+    snapshot_interval = envvar_int_val("ELiSE_SNAPSHOT_INTERVAL", 0)
+    snapshot_dir = f"{envvar_path_val('ELiSE_WORKING_DIR')}/snapshots"
+    snapshot_path = f"{snapshot_dir}/sim_{sim_idx}_input_{inp_idx}_scheduler_{sched_idx}.snapshot"
+
+    if snapshot_interval > 0 and os.path.exists(snapshot_path):
+        # Resume the simulation from the latest snapshot
+        logger.debug(f"Restoring simulation[{sim_idx}] from snapshot: {snapshot_path}")
+        compengine = ComputeEngine.restore(snapshot_path)
+        database = compengine.db
+        cluster = compengine.cluster
+        scheduler = compengine.scheduler
+        evt_logger = compengine.logger
+    elif compengine.forked_at is not None:
+        # The simulation was forked from a warm-up prefix and is already set up
+        logger.debug(f"Continuing simulation[{sim_idx}] forked at {compengine.forked_at}, (input[{inp_idx}], scheduler[{sched_idx}])")
+    else:
+        logger.debug(f"Setting up the cluster, scheduler and event logger, (input[{inp_idx}], scheduler[{sched_idx}], simulation[{sim_idx}])")
+
+        cluster.setup()
+        scheduler.setup()
+        evt_logger.setup()
+
     comp_logger = logger.getChild("compengine")
     if envvar_bool_val("ELiSE_DEBUG"):
         handler_and_formatter(comp_logger)
     compengine.debug_logger = comp_logger
 
-    logger.debug(f"Setting up the cluster, scheduler and event logger, (input[{inp_idx}], scheduler[{sched_idx}], simulation[{sim_idx}])")
-
-    cluster.setup()
-    scheduler.setup()
-    evt_logger.setup()
-
-    # Progress counter
-    total_jobs = len(database.preloaded_queue)
+    if snapshot_interval > 0:
+        os.makedirs(snapshot_dir, exist_ok=True)
 
     # Start timer
     start_time = time()
+    last_snapshot_time = start_time
     
     with profiling_ctx(sim_idx, scheduler.name, logger):
 
@@ -279,12 +302,25 @@ def single_simulation(sim_batch, server_ipaddr, server_port, webui=False):
             except:
                 logger.exception("An error occurred during the execution of the simulation")
 
-            progress_perc = 100 * (1 - (len(database.preloaded_queue) + len(cluster.waiting_queue) + len(cluster.execution_list)) / total_jobs)
+            if snapshot_interval > 0 and time() - last_snapshot_time >= snapshot_interval:
+                compengine.snapshot(snapshot_path)
+                last_snapshot_time = time()
+
+            # The total number of jobs of a stream is not known in advance so
+            # the progress is calculated over the jobs read so far
+            if database.jobs_stream is not None:
+                total_jobs = len(evt_logger.job_events)
+
+            progress_perc = 100 * (1 - (database.preloaded_jobs_num() + len(cluster.waiting_queue) + len(cluster.execution_list)) / total_jobs)
             sock = send_tcp_msg(sock, msg={"sim_id": sim_idx, "progress_perc": progress_perc}, json_fmt=True, reconnect_on_failure=True)
             if sock is None:
                 logger.critical("Can't connect to progress server.")
 
     
+    # The simulation finished so it will not be resumed
+    if snapshot_interval > 0 and os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+
     # Calculate the real time and simulated time
     real_time = time() - start_time
     sim_time = cluster.makespan
@@ -0,0 +1,134 @@
+"""
+Benchmark of the time advance backends of the ComputeEngine
+
+The same workload, generated from the loads of a LoadManager json file, is
+simulated once for every backend. The time spent inside the time advance of
+the engine (goto_next_sim_state) is reported separately from the total
+simulation time, which also includes the scheduling decisions. Cleaning the
+finished jobs from their hosts costs the same for every backend and it is not
+included in the time advance.
+
+The gains of the vectorised backends grow with the number of jobs executing
+concurrently, which is reported as the mean length of the execution list over
+the simulation steps. Below about 500 concurrent jobs the per-step overhead
+of the numpy calls is larger than the loop it replaces and the "numpy"
+backend is slower than the "loop" backend. For example, about 200 and 750
+jobs execute concurrently in the following runs:
+    python benchmarks/compengine_backends.py --jobs 3000 --nodes 2000 --socket-conf 40 40
+    python benchmarks/compengine_backends.py --loads ../pools/lm-remake-g5k.nancy.grvingt-NAS.json --jobs 4000 --nodes 3000 --socket-conf 16 16
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..")
+))
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..")
+))
+
+from api.loader import LoadManager
+from common.utils import define_logger
+from realsim.jobs.utils import deepcopy_list
+from realsim.database import Database
+from realsim.cluster.cluster import Cluster
+from realsim.logger.logger import Logger
+from realsim.compengine import ComputeEngine
+from realsim.generators.randomfrominput import RandomGenerator
+from realsim.scheduler.schedulers.fifo import FIFOScheduler
+from realsim.scheduler.schedulers.easy import EASYScheduler
+
+logger = define_logger()
+
+SCHEDULERS = {
+    "fifo": FIFOScheduler,
+    "easy": EASYScheduler
+}
+
+
+def simulate(jobs, heatmap, lm, nodes, socket_conf, scheduler_cls, backend):
+    """Run a whole simulation and return the makespan, the total time, the
+    time spent advancing the simulation time and the mean number of jobs
+    executing at every step
+    """
+
+    database = Database(deepcopy_list(jobs), heatmap, lm=lm)
+    database.setup()
+    cluster = Cluster(nodes, socket_conf)
+    scheduler = scheduler_cls()
+    evt_logger = Logger(debug=False)
+    compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
+    compengine.backend = backend
+    compengine.debug_logger = logger
+    compengine.setup_preloaded_jobs()
+
+    cluster.setup()
+    scheduler.setup()
+    evt_logger.setup()
+
+    # Time only the time advance of the engine
+    advance_time = 0.0
+    goto_next_sim_state = compengine.goto_next_sim_state
+    clean_job_from_hosts = compengine.clean_job_from_hosts
+
+    def timed_goto_next_sim_state():
+        nonlocal advance_time
+        start = perf_counter()
+        goto_next_sim_state()
+        advance_time += perf_counter() - start
+
+    def untimed_clean_job_from_hosts(job):
+        nonlocal advance_time
+        start = perf_counter()
+        clean_job_from_hosts(job)
+        advance_time -= perf_counter() - start
+
+    compengine.goto_next_sim_state = timed_goto_next_sim_state
+    compengine.clean_job_from_hosts = untimed_clean_job_from_hosts
+
+    executing = list()
+    start = perf_counter()
+    while database.preloaded_queue != [] or cluster.waiting_queue != [] or cluster.execution_list != []:
+        compengine.sim_step()
+        executing.append(len(cluster.execution_list))
+    total_time = perf_counter() - start
+
+    return cluster.makespan, total_time, advance_time, sum(executing) / len(executing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the time advance backends of the ComputeEngine")
+    parser.add_argument("--loads", default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "pools", "lm-aris.compute-NAS.json")),
+                        help="LoadManager json file to generate the workload from")
+    parser.add_argument("--jobs", type=int, default=2000, help="Number of jobs in the workload")
+    parser.add_argument("--nodes", type=int, default=5000, help="Number of nodes of the cluster")
+    parser.add_argument("--socket-conf", type=int, nargs="+", default=[10, 10], help="Cores per socket of a node")
+    parser.add_argument("--scheduler", choices=list(SCHEDULERS.keys()), default="fifo")
+    parser.add_argument("--backends", nargs="+", default=["loop", "events", "numpy"],
+                        help="Backends to compare; \"numpy\" is slower than \"loop\" below about "
+                             "500 jobs executing concurrently")
+    args = parser.parse_args()
+
+    lm = LoadManager(machine="", suite="")
+    lm.import_from_json(args.loads)
+    heatmap = lm.export_heatmap()
+
+    # All the backends simulate the same workload
+    jobs = RandomGenerator(load_manager=lm).generate_jobs_set(args.jobs)
+
+    print(f"{'backend':<10}{'makespan':>16}{'executing':>11}{'total (s)':>12}{'advance (s)':>14}{'speedup':>10}")
+
+    reference = None
+    for backend in args.backends:
+        makespan, total_time, advance_time, executing = simulate(jobs, heatmap, lm, args.nodes, tuple(args.socket_conf),
+                                                                 SCHEDULERS[args.scheduler], backend)
+        if reference is None:
+            reference = advance_time
+        print(f"{backend:<10}{makespan:>16.2f}{executing:>11.1f}{total_time:>12.3f}{advance_time:>14.3f}{reference / advance_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
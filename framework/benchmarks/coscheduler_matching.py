@@ -0,0 +1,164 @@
+"""
+Benchmark of the scheduling decisions of the co-schedulers
+
+The same workload, generated from the loads of a LoadManager json file, is
+simulated once for every co-scheduler. All the jobs arrive at the start of the
+simulation, so the first deploys see a waiting queue as deep as the workload.
+For every deploy the time of the whole scheduling pass is reported and the
+time of its decisions, i.e. the pass without the placement of the cores of
+the allocated jobs (ComputeEngine.place_job() and Host.get_free_psets()) that
+is the same for every scheduler. For the Matching co-scheduler the time to
+decide the matches of the pass (match()) is also reported.
+
+The matching of the Matching co-scheduler depends on the number of distinct
+loads and not on the depth of the waiting queue, for example:
+    python benchmarks/coscheduler_matching.py --jobs 1000 --nodes 500
+    python benchmarks/coscheduler_matching.py --loads ../pools/lm-remake-g5k.nancy.grvingt-NAS.json --jobs 1000 --nodes 200 --socket-conf 16 16
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..")
+))
+sys.path.append(os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..")
+))
+
+from api.loader import LoadManager
+from common.utils import define_logger
+from realsim.jobs.utils import deepcopy_list
+from realsim.database import Database
+from realsim.cluster.cluster import Cluster
+from realsim.cluster.host import Host
+from realsim.logger.logger import Logger
+from realsim.compengine import ComputeEngine
+from realsim.generators.randomfrominput import RandomGenerator
+from realsim.scheduler.coschedulers.ranks.bester import BesterCoscheduler
+from realsim.scheduler.coschedulers.ranks.jungle import JungleCoscheduler
+from realsim.scheduler.coschedulers.matching.matching import MatchingCoscheduler
+
+logger = define_logger()
+
+SCHEDULERS = {
+    "bester": BesterCoscheduler,
+    "jungle": JungleCoscheduler,
+    "matching": MatchingCoscheduler
+}
+
+
+def simulate(jobs, heatmap, lm, nodes, socket_conf, scheduler_cls):
+    """Run a whole simulation and return the makespan, the mean waiting time
+    of the jobs, the times of the deploys, the times of their decisions and
+    the times of the matches
+    """
+
+    database = Database(deepcopy_list(jobs), heatmap, lm=lm)
+    database.setup()
+    cluster = Cluster(nodes, socket_conf)
+    scheduler = scheduler_cls()
+    evt_logger = Logger(debug=False)
+    compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
+    compengine.debug_logger = logger
+    compengine.setup_preloaded_jobs()
+
+    cluster.setup()
+    scheduler.setup()
+    evt_logger.setup()
+
+    deploy_times = list()
+    decision_times = list()
+    match_times = list()
+    placement_time = [0.0]
+    deploy = scheduler.deploy
+    place_job = compengine.place_job
+    get_free_psets = Host.get_free_psets
+
+    def timed_deploy():
+        placement_start = placement_time[0]
+        start = perf_counter()
+        deployed = deploy()
+        deploy_times.append(perf_counter() - start)
+        decision_times.append(deploy_times[-1] - (placement_time[0] - placement_start))
+        return deployed
+
+    def timed_place_job(*args):
+        start = perf_counter()
+        place_job(*args)
+        placement_time[0] += perf_counter() - start
+
+    def timed_get_free_psets(host, *args):
+        start = perf_counter()
+        psets = get_free_psets(host, *args)
+        placement_time[0] += perf_counter() - start
+        return psets
+
+    scheduler.deploy = timed_deploy
+    compengine.place_job = timed_place_job
+    Host.get_free_psets = timed_get_free_psets
+
+    if isinstance(scheduler, MatchingCoscheduler):
+        match = scheduler.match
+
+        def timed_match():
+            start = perf_counter()
+            matches = match()
+            match_times.append(perf_counter() - start)
+            return matches
+
+        scheduler.match = timed_match
+
+    try:
+        while database.preloaded_queue != [] or cluster.waiting_queue != [] or cluster.execution_list != []:
+            compengine.sim_step()
+    finally:
+        Host.get_free_psets = get_free_psets
+
+    waiting_times = [job_evts["waiting time"] for job_evts in evt_logger.job_events.values()]
+
+    return cluster.makespan, float(np.mean(waiting_times)), deploy_times, decision_times, match_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling decisions of the co-schedulers")
+    parser.add_argument("--loads", default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "pools", "lm-aris.compute-NAS.json")),
+                        help="LoadManager json file to generate the workload from")
+    parser.add_argument("--jobs", type=int, default=1000, help="Number of jobs in the workload")
+    parser.add_argument("--nodes", type=int, default=500, help="Number of nodes of the cluster")
+    parser.add_argument("--socket-conf", type=int, nargs="+", default=[10, 10], help="Cores per socket of a node")
+    parser.add_argument("--schedulers", nargs="+", choices=list(SCHEDULERS.keys()), default=list(SCHEDULERS.keys()))
+    args = parser.parse_args()
+
+    lm = LoadManager(machine="", suite="")
+    lm.import_from_json(args.loads)
+    heatmap = lm.export_heatmap()
+
+    # All the co-schedulers simulate the same workload
+    jobs = RandomGenerator(load_manager=lm).generate_jobs_set(args.jobs)
+
+    print(f"{'scheduler':<10}{'makespan':>14}{'waiting':>12}{'deploys':>9}{'deploy mean (ms)':>18}{'deploy max (ms)':>17}"
+          f"{'decision mean (ms)':>20}{'decision p99 (ms)':>19}{'match mean (ms)':>17}{'match max (ms)':>16}")
+
+    for name in args.schedulers:
+        makespan, waiting_time, deploy_times, decision_times, match_times = simulate(jobs, heatmap, lm, args.nodes,
+                                                                                     tuple(args.socket_conf),
+                                                                                     SCHEDULERS[name])
+        deploy_ms = 1000 * np.array(deploy_times)
+        decision_ms = 1000 * np.array(decision_times)
+        line = f"{name:<10}{makespan:>14.2f}{waiting_time:>12.2f}{len(deploy_ms):>9}{deploy_ms.mean():>18.3f}{deploy_ms.max():>17.3f}"
+        line += f"{decision_ms.mean():>20.3f}{np.percentile(decision_ms, 99):>19.3f}"
+        if match_times != []:
+            match_ms = 1000 * np.array(match_times)
+            line += f"{match_ms.mean():>17.3f}{match_ms.max():>16.3f}"
+        else:
+            line += f"{'-':>17}{'-':>16}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
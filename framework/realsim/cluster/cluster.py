@@ -2,20 +2,118 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from realsim.cluster.host import Host
+from realsim.cluster.host import Host, BitmapHost
+from realsim.cluster.profile import AvailabilityProfile, ProfileStep
 from realsim.jobs.jobs import Job
+from realsim.jobs.utils import ExecutionList, WaitingQueue
+from collections.abc import Iterator, Mapping, Sequence
 from math import inf
+import numpy as np
+
+
+class LazyHosts(Mapping):
+    """The hosts of a cluster by hostname where only the hosts that run jobs
+    exist as objects; an idle host is created on access and is kept only
+    after it is materialised for a deployment
+    """
+
+    def __init__(self, host_cls: type, socket_conf: tuple, nodes: int):
+        self.host_cls = host_cls
+        self.socket_conf = socket_conf
+        self.nodes = nodes
+        self.cores_per_node = sum(socket_conf)
+
+        # The hosts that are running jobs
+        self.materialised: dict[str, Host] = dict()
+
+    def index(self, hostname: str) -> int:
+        """The number of a hostname; raises KeyError for an unknown host
+        """
+        if hostname.startswith("host") and hostname[4:].isdigit():
+            idx = int(hostname[4:])
+            if idx < self.nodes:
+                return idx
+        raise KeyError(hostname)
+
+    def idle_host(self, hostname: str) -> Host:
+        idx = self.index(hostname)
+        return self.host_cls(self.socket_conf, idx * self.cores_per_node + 1)
+
+    def __getitem__(self, hostname: str) -> Host:
+        host = self.materialised.get(hostname)
+        if host is None:
+            # Changes to an idle host that was not materialised are lost
+            host = self.idle_host(hostname)
+        return host
+
+    def materialise(self, hostname: str) -> Host:
+        if hostname not in self.materialised:
+            self.materialised[hostname] = self.idle_host(hostname)
+        return self.materialised[hostname]
+
+    def fold(self, hostname: str) -> None:
+        """Forget a host that became idle; it is identical to a new host
+        """
+        self.materialised.pop(hostname, None)
+
+    def __contains__(self, hostname) -> bool:
+        try:
+            self.index(hostname)
+        except (KeyError, AttributeError):
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        return (f"host{i}" for i in range(self.nodes))
+
+    def __len__(self) -> int:
+        return self.nodes
+
+
+class HostNames(Sequence):
+    """The hostnames of a lazy cluster in cluster order
+    """
+
+    def __init__(self, nodes: int):
+        self.nodes = nodes
+
+    def __getitem__(self, idx: int) -> str:
+        if not 0 <= idx < self.nodes:
+            raise IndexError(idx)
+        return f"host{idx}"
+
+    def __len__(self) -> int:
+        return self.nodes
 
 
 class Cluster:
 
-    def __init__(self, nodes: int, socket_conf: tuple):
+    # How the cores of each host are represented
+    # + "procset" : a processor set per socket
+    # + "bitmap"  : a bitmask per socket with cached counts of free cores
+    HOST_BACKENDS = {
+        "procset": Host,
+        "bitmap": BitmapHost,
+    }
+
+    def __init__(self,
+                 nodes: int,
+                 socket_conf: tuple,
+                 host_backend: str = "procset",
+                 lazy_hosts: bool = False):
         """
         + nodes: the number of nodes
         + socket_conf: the socket configuration; for example (10, 16) means 2
         sockets of which the first has 10 cores and the second has 16 cores
+        + host_backend: the representation of the cores of the hosts
+        + lazy_hosts: create the host objects only while they run jobs
         """
 
+        if host_backend not in Cluster.HOST_BACKENDS:
+            raise RuntimeError(f"Unknown host backend: {host_backend}")
+        self.host_backend = host_backend
+        host_cls = Cluster.HOST_BACKENDS[host_backend]
+
         # Number of nodes
         self.nodes = nodes
 
@@ -29,10 +127,21 @@ class Cluster:
 
         # Hosts where the hostname is a the string 'host' followed by a number
         _cores_per_node = sum(socket_conf)
-        self.hosts: dict[str, Host] = {
-                f"host{i}": Host(socket_conf, i * _cores_per_node + 1)
-                for i in range(nodes)
-        }
+        self.lazy_hosts = lazy_hosts
+        if lazy_hosts:
+            self.hosts: Mapping[str, Host] = LazyHosts(host_cls, socket_conf, nodes)
+            self.hostnames: Sequence[str] = HostNames(nodes)
+        else:
+            self.hosts: Mapping[str, Host] = {
+                    f"host{i}": host_cls(socket_conf, i * _cores_per_node + 1)
+                    for i in range(nodes)
+            }
+            self.hostnames: Sequence[str] = list(self.hosts.keys())
+            self.host_indices: dict[str, int] = {name: i for i, name in enumerate(self.hostnames)}
+
+        # The free cores of every socket of every host; the row of a host is
+        # its index in self.hostnames, which keeps the order of self.hosts
+        self.free_matrix = np.tile(np.array(socket_conf, dtype=np.int64), (nodes, 1))
 
         # Number of current free cores
         self.free_cores = self.nodes * _cores_per_node
@@ -46,9 +155,25 @@ class Cluster:
         # Waiting queue size
         self.queue_size = inf
         # The queue of waiting jobs
-        self.waiting_queue: list[Job] = list()
+        self.waiting_queue: WaitingQueue = WaitingQueue()
         # The list of executing jobs
-        self.execution_list: list[Job] = list()
+        self.execution_list: ExecutionList = ExecutionList()
+        # The waiting and executing jobs by their handle; the state of a job
+        # is kept by its current_state
+        self.jobs: dict[int, Job] = dict()
+
+        # Availability profiles of the executing jobs by their estimated end
+        # time (start time plus wall time)
+        # + job_profile: every job releases the number of its hosts
+        # + host_profile: every host that can't fit a half socket allocation
+        #   is released by the first of its jobs that ends
+        self.job_profile = AvailabilityProfile()
+        self.host_profile = AvailabilityProfile()
+        # Orders the jobs with the same estimated end time by their start
+        self.profile_seq: int = 0
+        # Changes every time a job returns its cores; the hosts that fit an
+        # allocation can only increase when the epoch changes
+        self.capacity_epoch: int = 0
 
         # Important counters #
 
@@ -60,7 +185,94 @@ class Cluster:
         self.makespan: float = 0
 
     def setup(self):
-        self.execution_list = list()
+        self.execution_list = ExecutionList()
+
+    def register_job(self, job: Job) -> None:
+        """Add or replace a job in the registry of the cluster's jobs
+        """
+        self.jobs[job.job_id] = job
+
+    def unregister_job(self, job: Job) -> None:
+        self.jobs.pop(job.job_id, None)
+
+    def profile_job_start(self, job: Job, num_of_hosts: int) -> None:
+        self.job_profile.add(job.job_id, job.start_time + job.wall_time,
+                             num_of_hosts, job.job_id, self.profile_seq)
+        self.profile_seq += 1
+
+    def profile_job_finish(self, job: Job) -> None:
+        self.job_profile.remove(job.job_id)
+
+    def profile_overdue_jobs(self, now: float, wall_time_ratio: float) -> None:
+        """Move the estimated end of the executing jobs that outlived their
+        wall time; such a job runs until it ends or it is aborted, so its end
+        is estimated at the time it is aborted and never before now
+        """
+        overdue = list()
+        for step in self.job_profile:
+            if step.time > now:
+                break
+            overdue.append(step)
+
+        for step in overdue:
+            job = self.jobs[step.item]
+            end = max(now, job.start_time + job.wall_time * (1 + wall_time_ratio))
+            self.job_profile.add(job.job_id, end, step.units, step.item, step.seq)
+            for hostname in job.assigned_hosts:
+                self.profile_host(hostname)
+
+    def profile_host(self, hostname: str) -> None:
+        """Update the availability of a host after its jobs changed
+        """
+        free = self.free_matrix[self.host_index(hostname)]
+        if (free >= self.half_socket_allocation).all() or self.hosts[hostname].jobs == dict():
+            self.host_profile.remove(hostname)
+            return
+
+        step: ProfileStep = min(self.job_profile.get(handle) for handle in self.hosts[hostname].jobs)
+        self.host_profile.add(hostname, step.time, 1, step.item, step.seq)
+
+    def host_index(self, hostname: str) -> int:
+        if self.lazy_hosts:
+            return self.hosts.index(hostname)
+        return self.host_indices[hostname]
+
+    def materialise_host(self, hostname: str) -> Host:
+        """The host that a job will be deployed to
+        """
+        if self.lazy_hosts:
+            return self.hosts.materialise(hostname)
+        return self.hosts[hostname]
+
+    def fold_host(self, hostname: str) -> None:
+        """Called when a host becomes idle again
+        """
+        if self.lazy_hosts:
+            self.hosts.fold(hostname)
+
+    def update_host_free_cores(self, hostname: str) -> None:
+        """Copy the free cores per socket of a host to the free cores matrix
+        """
+        self.free_matrix[self.host_index(hostname)] = self.hosts[hostname].get_free_cores()
+
+    def fitting_mask(self, socket_conf: tuple) -> np.ndarray:
+        """Boolean mask of the hosts that have enough free cores in every
+        socket for a socket configuration
+        """
+        return (self.free_matrix >= socket_conf).all(axis=1)
+
+    def count_fitting_hosts(self, socket_conf: tuple) -> int:
+        return int(np.count_nonzero(self.fitting_mask(socket_conf)))
+
+    def first_fitting_hosts(self, socket_conf: tuple, k: int = None) -> list[str]:
+        """The first k hosts, in cluster order, that fit a socket
+        configuration; all of them if k is None
+        """
+        indices = np.flatnonzero(self.fitting_mask(socket_conf))[:k]
+        return [self.hostnames[idx] for idx in indices.tolist()]
+
+    def count_idle_hosts(self) -> int:
+        return self.count_fitting_hosts(self.socket_conf)
 
     def get_idle_cores(self) -> int:
         return self.idle_cores
@@ -1,3 +1,5 @@
+from collections.abc import Hashable
+from typing import Any
 from procset import ProcSet
 
 class Host:
@@ -8,24 +10,105 @@ class Host:
     DOWN = 2
 
     def __init__(self,
-                 socket_conf: tuple, 
+                 socket_conf: tuple,
                  first_core_id: int):
-        
+
         self.socket_conf = socket_conf
-        self.sockets: list[ProcSet] = list()
 
         # Define sockets
+        self.init_sockets(first_core_id)
+
+        # Set starting state of a host
+        self.state = Host.IDLE
+
+        # Get references of the jobs running on the host by their handle (id)
+        # and the cores of each socket they own
+        self.jobs: dict[int, list] = dict()
+        # The load name indices of the jobs running on the host
+        self.job_loads: dict[int, int] = dict()
+        # The number of jobs of each load running on the host
+        self.load_counts: dict[int, int] = dict()
+        # Results of the co-scheduling heuristics against the jobs running on
+        # the host by candidate load, or by scheduler for the results that
+        # don't depend on the candidate; cleared when the jobs change
+        self.corunner_cache: dict[Hashable, Any] = dict()
+
+    def init_sockets(self, first_core_id: int) -> None:
+        self.sockets: list[ProcSet] = list()
+
         _count = first_core_id
-        for cores in socket_conf:
+        for cores in self.socket_conf:
             self.sockets.append(ProcSet((_count, _count + cores - 1)))
             _count += cores
 
-        # Set starting state of a host
-        self.state = Host.IDLE
+    def add_job(self, job_id: int, load: int, psets: list) -> None:
+        """Register a job deployed to the host with the cores it owns
+        """
+        self.jobs[job_id] = psets
+        self.job_loads[job_id] = load
+        self.load_counts[load] = self.load_counts.get(load, 0) + 1
+        self.corunner_cache.clear()
+
+    def remove_job(self, job_id: int) -> list:
+        """Unregister a job from the host and return the cores it owned
+        """
+        load = self.job_loads.pop(job_id)
+        if self.load_counts[load] == 1:
+            del self.load_counts[load]
+        else:
+            self.load_counts[load] -= 1
+        self.corunner_cache.clear()
+
+        return self.jobs.pop(job_id)
+
+    def get_free_psets(self, socket_conf: tuple) -> list[ProcSet]:
+        """The first free cores of each socket for a socket configuration
+        """
+        psets = list()
+        for socket, req in zip(self.sockets, socket_conf):
+            intervals = list()
+            for interval in socket.intervals():
+                if req <= 0:
+                    break
+                cores = min(req, len(interval))
+                intervals.append((interval.inf, interval.inf + cores - 1))
+                req -= cores
+            psets.append(ProcSet(*intervals))
+
+        return psets
+
+    def allocate(self, psets: list[ProcSet]) -> int:
+        """Remove the cores of each socket from the free ones and return their
+        number
+        """
+        cores = 0
+        for socket_pset, pset in zip(self.sockets, psets):
+            socket_pset -= pset
+            cores += len(pset)
+
+        return cores
+
+    def release(self, psets: list[ProcSet]) -> int:
+        """Return the cores of each socket to the free ones and return their
+        number
+        """
+        cores = 0
+        for i, pset in enumerate(psets):
+            self.sockets[i] = self.sockets[i].union(pset)
+            cores += len(pset)
+
+        return cores
+
+    def get_free_cores(self) -> tuple:
+        """The number of free cores of each socket
+        """
+        return tuple(len(pset) for pset in self.sockets)
+
+    def to_procsets(self, psets: list[ProcSet]) -> list[ProcSet]:
+        """The processor sets of cores owned by a job, used for exporting
+        """
+        return psets
 
-        # Get references of the jobs running on the host
-        self.jobs: dict[str, list[ProcSet]] = dict()
- 
     def get_idle_cores_num(self) -> int:
         _sum = 0
         for pset in self.sockets:
@@ -37,5 +120,90 @@ class Host:
         return sum(self.socket_conf) - self.get_idle_cores_num()
 
 
+class BitmapHost(Host):
+    """Host whose cores are kept as a bitmask per socket where the bit k is
+    the k-th core of the socket; the number of free cores of each socket is
+    cached
+    """
+
+    def init_sockets(self, first_core_id: int) -> None:
+        self.socket_offsets: list[int] = list()
+        self.free_masks: list[int] = list()
+        self.free_counts: list[int] = list()
+
+        _count = first_core_id
+        for cores in self.socket_conf:
+            self.socket_offsets.append(_count)
+            self.free_masks.append((1 << cores) - 1)
+            self.free_counts.append(cores)
+            _count += cores
+
+    @property
+    def sockets(self) -> list[ProcSet]:
+        return self.to_procsets(self.free_masks)
+
+    def get_free_psets(self, socket_conf: tuple) -> list[int]:
+        """The masks of the first free cores of each socket for a socket
+        configuration
+        """
+        masks = list()
+        for mask, req in zip(self.free_masks, socket_conf):
+            taken = 0
+            while req > 0 and mask:
+                # The lowest run of consecutive free cores
+                low = mask & -mask
+                run = mask & ~(mask + low)
+                run_cores = run.bit_count()
+                if run_cores > req:
+                    run = low * ((1 << req) - 1)
+                    run_cores = req
+                taken |= run
+                mask ^= run
+                req -= run_cores
+            masks.append(taken)
+
+        return masks
+
+    def allocate(self, masks: list[int]) -> int:
+        cores = 0
+        for i, mask in enumerate(masks):
+            count = mask.bit_count()
+            self.free_masks[i] &= ~mask
+            self.free_counts[i] -= count
+            cores += count
+
+        return cores
+
+    def release(self, masks: list[int]) -> int:
+        cores = 0
+        for i, mask in enumerate(masks):
+            count = mask.bit_count()
+            self.free_masks[i] |= mask
+            self.free_counts[i] += count
+            cores += count
+
+        return cores
+
+    def get_free_cores(self) -> tuple:
+        return tuple(self.free_counts)
+
+    def to_procsets(self, masks: list[int]) -> list[ProcSet]:
+        psets = list()
+        for offset, mask in zip(self.socket_offsets, masks):
+            intervals = list()
+            while mask:
+                low = mask & -mask
+                run = mask & ~(mask + low)
+                first = offset + low.bit_length() - 1
+                intervals.append((first, first + run.bit_count() - 1))
+                mask ^= run
+            psets.append(ProcSet(*intervals))
+
+        return psets
+
+    def get_idle_cores_num(self) -> int:
+        return sum(self.free_counts)
+
+
 # Alias for Host class
 Node = Host
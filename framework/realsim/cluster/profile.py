@@ -0,0 +1,325 @@
+"""
+Availability profiles of a cluster. A profile is a step function of the
+resources (nodes or hosts) that become available over time, kept sorted by
+time and updated when jobs start and finish, so that the backfilling
+schedulers can find the earliest time enough resources are available
+without sorting the executing jobs on every call.
+
+The distinct times of the steps are the nodes of a treap (a binary search
+tree balanced by random priorities). Every node keeps the net units of its
+steps, the sum of the units of its subtree and the lowest and highest level
+(cumulative units) reached in its subtree. For a profile of n distinct
+times and k steps at the same time:
++ add() and remove() are O(log n + k)
++ earliest() is O(log n + k)
++ earliest_fit() is O(log n) for every start time it rejects, since the
+  next time the level drops below or rises above a number of units is found
+  by one descent of the tree
+"""
+
+from bisect import bisect_left, insort
+from collections import namedtuple
+from collections.abc import Hashable, Iterator
+from typing import Any, Optional
+from math import inf
+import random
+
+# A step of a profile; the steps at the same time are ordered by their
+# sequence number and item is the owner of the step (e.g. a job handle)
+ProfileStep = namedtuple("ProfileStep", ["time", "seq", "units", "item"])
+
+
+class ProfileNode:
+    """A distinct time of a profile in the treap
+    """
+
+    __slots__ = ("time", "priority", "left", "right", "units", "total", "lowest", "highest")
+
+    def __init__(self, time: float, priority: float):
+        self.time = time
+        self.priority = priority
+        self.left: Optional[ProfileNode] = None
+        self.right: Optional[ProfileNode] = None
+        # Net units of the steps at this time
+        self.units = 0
+        # Sum of the units of the subtree and the lowest and highest level
+        # after any of its times, relative to the level before the subtree
+        self.total = 0
+        self.lowest = 0
+        self.highest = 0
+
+    def update(self) -> None:
+        left, right = self.left, self.right
+        level = self.units
+        lowest = highest = level
+
+        if left is not None:
+            level += left.total
+            lowest = left.lowest if left.lowest < level else level
+            highest = left.highest if left.highest > level else level
+
+        if right is not None:
+            if level + right.lowest < lowest:
+                lowest = level + right.lowest
+            if level + right.highest > highest:
+                highest = level + right.highest
+            self.total = level + right.total
+        else:
+            self.total = level
+
+        self.lowest = lowest
+        self.highest = highest
+
+
+def rotate_right(node: ProfileNode) -> ProfileNode:
+    top = node.left
+    node.left = top.right
+    node.update()
+    top.right = node
+    top.update()
+    return top
+
+
+def rotate_left(node: ProfileNode) -> ProfileNode:
+    top = node.right
+    node.right = top.left
+    node.update()
+    top.left = node
+    top.update()
+    return top
+
+
+def merge(left: Optional[ProfileNode], right: Optional[ProfileNode]) -> Optional[ProfileNode]:
+    """Merge two treaps where every time of left is before the times of right
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        left.right = merge(left.right, right)
+        left.update()
+        return left
+
+    right.left = merge(left, right.left)
+    right.update()
+    return right
+
+
+class AvailabilityProfile:
+
+    def __init__(self):
+
+        # The treap of the distinct times of the steps
+        self.root: Optional[ProfileNode] = None
+        # The steps at every time sorted by sequence number
+        self.groups: dict[float, list[ProfileStep]] = dict()
+
+        # The step of every entry by its id
+        self.entries: dict[Hashable, ProfileStep] = dict()
+
+        # The priorities of the nodes only shape the treap
+        self.priorities = random.Random(0)
+
+    def add(self, entry_id: Hashable, time: float, units: int, item: Any = None, seq: int = 0) -> None:
+        """Release (or take if negative) a number of units at a time; an
+        existing entry with the same id is replaced
+        """
+        self.remove(entry_id)
+
+        step = ProfileStep(time, seq, units, item)
+        group = self.groups.get(time)
+        if group is None:
+            self.groups[time] = [step]
+        else:
+            insort(group, step)
+        self.entries[entry_id] = step
+
+        self.root = self.add_units(self.root, time, units)
+
+    def remove(self, entry_id: Hashable) -> None:
+        """Remove an entry if it exists
+        """
+        step = self.entries.pop(entry_id, None)
+        if step is None:
+            return
+
+        group = self.groups[step.time]
+        if len(group) == 1:
+            del self.groups[step.time]
+            self.root = self.remove_time(self.root, step.time)
+        else:
+            del group[bisect_left(group, step)]
+            self.root = self.add_units(self.root, step.time, -step.units)
+
+    def add_units(self, node: Optional[ProfileNode], time: float, units: int) -> ProfileNode:
+        """Add units to the node of a time, which is created if it doesn't
+        exist, and return the new root of the tree
+        """
+        # The path from the root to the node of the time
+        path: list[ProfileNode] = list()
+        while node is not None and node.time != time:
+            path.append(node)
+            node = node.left if time < node.time else node.right
+
+        if node is None:
+            node = ProfileNode(time, self.priorities.random())
+        node.units += units
+        node.update()
+
+        # Attach the node to its parent and rotate it up while its priority
+        # is higher; the nodes above it are updated on the way to the root
+        while path:
+            parent = path.pop()
+            if time < parent.time:
+                parent.left = node
+                node = rotate_right(parent) if node.priority > parent.priority else parent
+            else:
+                parent.right = node
+                node = rotate_left(parent) if node.priority > parent.priority else parent
+            node.update()
+
+        return node
+
+    def remove_time(self, node: ProfileNode, time: float) -> Optional[ProfileNode]:
+        """Remove the node of a time and return the new root of the subtree
+        """
+        if time < node.time:
+            node.left = self.remove_time(node.left, time)
+        elif time > node.time:
+            node.right = self.remove_time(node.right, time)
+        else:
+            return merge(node.left, node.right)
+
+        node.update()
+        return node
+
+    def get(self, entry_id: Hashable) -> Optional[ProfileStep]:
+        return self.entries.get(entry_id)
+
+    def reserve(self, entry_id: Hashable, start: float, end: float, units: int, item: Any = None, seq: int = 0) -> None:
+        """Take a number of units from start until end
+        """
+        self.add((entry_id, "start"), start, -units, item, seq)
+        self.add((entry_id, "end"), end, units, item, seq)
+
+    def cancel(self, entry_id: Hashable) -> None:
+        self.remove((entry_id, "start"))
+        self.remove((entry_id, "end"))
+
+    def level_at(self, time: float) -> int:
+        """The units released by the steps until and including a time
+        """
+        level = 0
+        node = self.root
+        while node is not None:
+            if node.time <= time:
+                level += node.units + (node.left.total if node.left is not None else 0)
+                node = node.right
+            else:
+                node = node.left
+        return level
+
+    def first_below(self, node: Optional[ProfileNode], level: int, after: float, units: int) -> Optional[float]:
+        """The first time of a subtree after a time where the level drops
+        below units; level is the level before the subtree
+        """
+        if node is None or level + node.lowest >= units:
+            return None
+
+        level_here = level + node.units + (node.left.total if node.left is not None else 0)
+        if node.time <= after:
+            return self.first_below(node.right, level_here, after, units)
+
+        time = self.first_below(node.left, level, after, units)
+        if time is not None:
+            return time
+        if level_here < units:
+            return node.time
+        return self.first_below(node.right, level_here, after, units)
+
+    def first_above(self, node: Optional[ProfileNode], level: int, after: float, units: int) -> Optional[tuple[float, int]]:
+        """The first time of a subtree after a time where the level is at
+        least units and the level before that time; level is the level
+        before the subtree
+        """
+        if node is None or level + node.highest < units:
+            return None
+
+        level_before = level + (node.left.total if node.left is not None else 0)
+        level_here = level_before + node.units
+        if node.time <= after:
+            return self.first_above(node.right, level_here, after, units)
+
+        found = self.first_above(node.left, level, after, units)
+        if found is not None:
+            return found
+        if level_here >= units:
+            return node.time, level_before
+        return self.first_above(node.right, level_here, after, units)
+
+    def earliest(self, units: int, free: int = 0) -> Optional[ProfileStep]:
+        """The first step after which the free units plus the released ones
+        are at least units; None if there are never enough units. Only for
+        profiles that release units.
+        """
+        found = self.first_above(self.root, free, -inf, units)
+        if found is None:
+            return None
+
+        time, level = found
+        for step in self.groups[time]:
+            level += step.units
+            if level >= units:
+                return step
+
+        return None
+
+    def earliest_fit(self, units: int, duration: float, free: int, now: float, latest: float = inf) -> float:
+        """The earliest time from now on that at least units are available
+        for a duration; free are the units available now besides the steps
+        of the profile. Returns inf if there are never enough units. If a
+        start time that is known to fit is given as latest, only the earlier
+        start times are searched.
+        """
+
+        # The steps until now are folded in the level of now; a start time is
+        # feasible if the level doesn't drop below units before the duration
+        # has passed
+        if free + self.level_at(now) >= units:
+            short = self.first_below(self.root, free, now, units)
+            if short is None or short >= now + duration:
+                return now
+        if now >= latest:
+            return latest
+
+        # The later start times are the times the level rises to units; the
+        # ones before the level drops again are too short as well
+        after = now
+        while True:
+            found = self.first_above(self.root, free, after, units)
+            if found is None or found[0] > latest:
+                return latest
+
+            start = found[0]
+            short = self.first_below(self.root, free, start, units)
+            if short is None or short >= start + duration:
+                return start
+            after = short
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[ProfileStep]:
+        """The steps in order of time and sequence number
+        """
+        stack: list[ProfileNode] = list()
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield from self.groups[node.time]
+            node = node.right
@@ -1,8 +1,16 @@
 # Utilities
+from copy import deepcopy
+from functools import reduce
+from heapq import heappush, heappop
+from itertools import islice
 from math import inf, ceil
+from operator import sub
+from typing import Optional
 import numpy as np
 import os
+import pickle
 import sys
+import zlib
 
 sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../")
@@ -22,6 +30,10 @@ import realsim.logger.logevts as evts
 
 
 class ComputeEngine:
+
+    # Header of the simulation snapshot files
+    SNAPSHOT_MAGIC = b"ELiSE-SNAPSHOT"
+    SNAPSHOT_VERSION = 1
     
     def __init__(self, 
                  db: Database,
@@ -48,159 +60,414 @@ class ComputeEngine:
         # Features for compengine
         self.wall_time_ratio = 0
 
+        # How the simulation time is advanced
+        # + "loop"   : scan the whole execution list on every step
+        # + "events" : keep a calendar of the projected finish times and the
+        #              abort deadlines of the executing jobs
+        # + "numpy"  : mirror the executing jobs in contiguous arrays and
+        #              advance their times with vectorised operations; it is
+        #              slower than "loop" below about 500 jobs executing
+        #              concurrently (see benchmarks/compengine_backends.py)
+        self.backend = "loop"
+
+        # The simulation time when this simulation was forked from another
+        self.forked_at: Optional[float] = None
+        # Jobs that have not arrived yet may be shared with forked simulations
+        # and they are copied when they arrive
+        self.copy_on_arrival: bool = False
+
+        # Submit time of the first job; every job is shifted to start at 0
+        self.first_submit_time: float = 0
+
+        # Handles of the executing jobs whose co-runners changed since the
+        # last time their speedup was calculated
+        self._dirty_handles: set[int] = set()
+
+        # Event calendar of the "events" backend; the remaining time of an
+        # executing job is brought up to date only when it is needed, by
+        # subtracting the time steps it missed one at a time like the "loop"
+        # backend does, so that both backends give exactly the same results.
+        # The log of time steps is cleared when it grows longer than the
+        # execution list, after every executing job is brought up to date
+        self._event_seq: int = 0
+        self._finish_events: list = list() # heap of (projected finish time, seq, job)
+        self._abort_events: list = list() # heap of (abort deadline, seq, job)
+        self._finish_seqs: dict[int, int] = dict() # job id -> seq of its live finish event
+        self._time_steps: list[float] = list() # time steps since the log was cleared
+        self._synced_steps: dict[int, int] = dict() # job id -> logged time steps subtracted
+
+        # Struct-of-arrays of the "numpy" backend; the first _soa_size entries
+        # follow the order of the cluster's execution list
+        self._soa_size: int = 0
+        self._soa_index: dict[int, int] = dict() # job id -> position in arrays
+        self._soa_jobs = np.empty(64, dtype=object)
+        self._soa_ids = np.zeros(64, dtype=np.int64)
+        self._soa_remaining = np.zeros(64, dtype=np.float64)
+        self._soa_start = np.zeros(64, dtype=np.float64)
+        self._soa_wall = np.zeros(64, dtype=np.float64)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The debug logger is attached again after a restore
+        state["debug_logger"] = None
+        return state
+
+    # Simulation snapshots
+    def snapshot(self, path: str) -> None:
+        """Write the whole state of the simulation (database, cluster,
+        scheduler, logger and compute engine) to a compressed binary file
+        """
+        data = zlib.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+
+        # Replace a previous snapshot only when the new one is complete
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fd:
+            fd.write(ComputeEngine.SNAPSHOT_MAGIC)
+            fd.write(bytes([ComputeEngine.SNAPSHOT_VERSION]))
+            fd.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def restore(path: str) -> 'ComputeEngine':
+        """Read a simulation snapshot and return its compute engine; the
+        database, cluster, scheduler and logger are reachable through it
+        """
+        with open(path, "rb") as fd:
+            magic = fd.read(len(ComputeEngine.SNAPSHOT_MAGIC))
+            version = fd.read(1)
+            if magic != ComputeEngine.SNAPSHOT_MAGIC or version != bytes([ComputeEngine.SNAPSHOT_VERSION]):
+                raise RuntimeError(f"The file {path} is not a compatible simulation snapshot")
+            compengine: ComputeEngine = pickle.loads(zlib.decompress(fd.read()))
+
+        return compengine
+
+    # Forked simulations
+    def fork(self, scheduler) -> 'ComputeEngine':
+        """Clone the current state of the simulation and continue the clone
+        under another (not yet set up) scheduler instance. The data that no
+        simulation modifies and the jobs that have not arrived yet are shared
+        between the clones instead of copied.
+        """
+
+        memo = {
+            id(self.db.speedups): self.db.speedups,
+            id(self.db.heatmap): self.db.heatmap,
+            id(self.db.engine): self.db.engine,
+            id(self.db.lm): self.db.lm,
+            id(self.db.jobs_stream): self.db.jobs_stream,
+            id(self.debug_logger): self.debug_logger,
+            # The clone references the new scheduler instead of a copy
+            id(self.scheduler): scheduler,
+        }
+
+        for job in self.db.preloaded_queue[self.db.preloaded_cursor:]:
+            memo[id(job)] = job
+        self.copy_on_arrival = True
+
+        compengine: ComputeEngine = deepcopy(self, memo)
+        compengine.debug_logger = self.debug_logger
+        compengine.forked_at = self.cluster.makespan
+
+        # Wire the new scheduler to the cloned simulation
+        scheduler.database = compengine.db
+        scheduler.cluster = compengine.cluster
+        scheduler.logger = compengine.logger
+        scheduler.compeng = compengine
+        compengine.logger.scheduler = scheduler
+        scheduler.setup()
+
+        return compengine
+
     # Database preloaded queue setup
     def setup_preloaded_jobs(self) -> None:
         """Setup the preloaded jobs that are currently stored in the database
         """
 
+        if self.db.jobs_stream is not None:
+            # Only the first job of a stream is pulled; the rest are set up
+            # when the simulation time reaches them
+            job = self.db.pull_streamed_job()
+            self.first_submit_time = job.submit_time
+            self.db.preloaded_queue = [job]
+            self.db.preloaded_cursor = 0
+            self.setup_preloaded_job(job)
+            return
+
         # Sort jobs by their time they will be appearing in the waiting queue
         self.db.preloaded_queue.sort(key=lambda job: job.submit_time)
+        self.db.preloaded_cursor = 0
         
         # Get the submit time of the first job and subtract it from the other jobs
         # We are shifting them to start = 0
-        first_submit_time = self.db.preloaded_queue[0].submit_time
+        self.first_submit_time = self.db.preloaded_queue[0].submit_time
 
         # Preload jobs and calculate their respective half and full node cores
         # usage
         for job in self.db.preloaded_queue:
+            self.setup_preloaded_job(job)
 
-            # Shift the job by first_submit_time amount
-            job.submit_time -= first_submit_time
-            
-            # Set job id
-            job.job_id = self.cluster.id_counter
-
-            # Setup core resources needed
-            job.full_socket_nodes = ceil(job.num_of_processes / sum(self.cluster.full_socket_allocation))
-            job.half_socket_nodes = ceil(job.num_of_processes / sum(self.cluster.half_socket_allocation))
-
-            # Setup job speedups
-            try:
-                speedups = list(self.db.heatmap[job.job_name].values())
-                speedups = [spd for spd in speedups if spd is not None]
-            except:
-                # Set everything to compact speedup if no list is given
-                speedups = [1]
-
-            min_speedup = speedups[0]
-            max_speedup = self.db.lm.loads[job.job_name].get_med_speedup(co_load=None)
-
-            # if no spread found failback to min speedup
-            if not max_speedup:
-                max_speedup = min_speedup
-
-            accumulator = length = 0
-            for speedup in speedups:
-                if speedup > max_speedup:
-                    max_speedup = speedup
-                if speedup < min_speedup:
-                    min_speedup = speedup
-
-                accumulator += speedup
-                length += 1
-
-            job.max_speedup = max_speedup
-            job.min_speedup = min_speedup
-            job.avg_speedup = (accumulator / length)
-
-            # Setup job characterization
-            avg = job.avg_speedup
-            std = round(float(np.std(speedups)), 2)
-
-            if avg > 1.02:
-                job.job_character = JobCharacterization.SPREAD
-            elif avg < 0.98:
-                job.job_character = JobCharacterization.COMPACT
+    def setup_preloaded_job(self, job: Job) -> None:
+
+        # Shift the job by first_submit_time amount
+        job.submit_time -= self.first_submit_time
+
+        # Set job id (handle) and the index of its load name
+        job.job_id = self.cluster.id_counter
+        job.load_index = self.db.get_load_index(job.job_name)
+
+        # Setup core resources needed
+        job.full_socket_nodes = ceil(job.num_of_processes / sum(self.cluster.full_socket_allocation))
+        job.half_socket_nodes = ceil(job.num_of_processes / sum(self.cluster.half_socket_allocation))
+
+        # Setup job speedups
+        if job.job_name in self.db.heatmap:
+            speedups = self.db.speedups.row_speedups(job.load_index)
+        else:
+            # Set everything to compact speedup if no list is given
+            speedups = [1]
+
+        min_speedup = speedups[0]
+        max_speedup = self.db.lm.loads[job.job_name].get_med_speedup(co_load=None)
+
+        # if no spread found failback to min speedup
+        if not max_speedup:
+            max_speedup = min_speedup
+
+        accumulator = length = 0
+        for speedup in speedups:
+            if speedup > max_speedup:
+                max_speedup = speedup
+            if speedup < min_speedup:
+                min_speedup = speedup
+
+            accumulator += speedup
+            length += 1
+
+        job.max_speedup = max_speedup
+        job.min_speedup = min_speedup
+        job.avg_speedup = (accumulator / length)
+
+        # Setup job characterization
+        avg = job.avg_speedup
+        std = round(float(np.std(speedups)), 2)
+
+        if avg > 1.02:
+            job.job_character = JobCharacterization.SPREAD
+        elif avg < 0.98:
+            job.job_character = JobCharacterization.COMPACT
+        else:
+            if std > 0.07:
+                job.job_character = JobCharacterization.FRAIL
             else:
-                if std > 0.07:
-                    job.job_character = JobCharacterization.FRAIL
-                else:
-                    job.job_character = JobCharacterization.ROBUST
+                job.job_character = JobCharacterization.ROBUST
 
-            self.cluster.id_counter += 1
+        self.cluster.id_counter += 1
 
-    def load_in_waiting_queue(self) -> None:
+    def pull_streamed_jobs(self) -> None:
+        """Pull jobs from the stream of the database until the preloaded queue
+        holds a job that arrives after the current simulation time
+        """
 
-        copy = deepcopy_list(self.db.preloaded_queue)
+        while self.db.jobs_stream is not None:
 
-        for job in copy:
-            if job.submit_time <= self.cluster.makespan:
-                # Infinite waiting queue size
-                # if self.cluster.queue_size == -1:
-                #     self.db.preloaded_queue.remove(job)
-                #     self.cluster.waiting_queue.append(job)
+            if self.db.preloaded_jobs_num() > 0 and self.db.preloaded_queue[-1].submit_time > self.cluster.makespan:
+                break
 
-                # # Zero size waiting queue
-                # elif self.cluster.queue_size == 0 and\
-                #         len(self.cluster.waiting_queue) == 0 and\
-                #         self.scheduler.find_suitable_nodes(job.num_of_processes, self.cluster.full_socket_allocation) != {}:
-                #             self.db.preloaded_queue.remove(job)
-                #             job.submit_time = self.cluster.makespan
-                #             self.cluster.waiting_queue.append(job)
+            job = self.db.pull_streamed_job()
+            if job is None:
+                break
+
+            if self.db.preloaded_queue != [] and job.submit_time - self.first_submit_time < self.db.preloaded_queue[-1].submit_time:
+                raise RuntimeError(f"The stream of jobs is not sorted by submit time at job {job.job_name}")
+
+            self.setup_preloaded_job(job)
+            self.db.preloaded_queue.append(job)
+            self.logger.init_job_events(job)
+
+    def load_in_waiting_queue(self) -> None:
 
-                # # Finite waiting queue size but not 0
-                # elif self.cluster.queue_size > 0 and len(self.cluster.waiting_queue) < self.cluster.queue_size:
-                self.db.preloaded_queue.remove(job)
-                job.submit_time = self.cluster.makespan
-                self.cluster.waiting_queue.append(job)
+        self.pull_streamed_jobs()
 
-                #else:
-                #    break
+        # Infinite waiting queue size
+        for job in self.db.pop_preloaded_jobs(self.cluster.makespan):
+            if self.copy_on_arrival:
+                job = job.deepcopy()
+            job.submit_time = self.cluster.makespan
+            self.cluster.waiting_queue.append(job)
+            self.cluster.register_job(job)
 
     # Job execution/deploying/cleaning computations
-    def calculate_job_rem_time(self, job: Job) -> None:
+    def calculate_job_worst_speedup(self, job: Job) -> Optional[float]:
+        """Return the worst speedup a spread job experiences among its
+        co-runners or None if the job is executing as compact
+        """
 
-        self.debug_logger.debug(f"Calculating remaining execution time of job {job.get_signature()} with inital value {job.remaining_time}")
+        # It is executing as compact
+        if job.socket_conf == self.cluster.socket_conf:
+            return None
 
         # The worst possible speedup
         worst_speedup = job.max_speedup
 
-        # Important flags
-        neighbors_exist = False
-        spread_allocation = not (job.socket_conf == self.cluster.socket_conf)
-        
-        if not spread_allocation:
+        co_loads = list()
+        for hostname in job.assigned_hosts:
+            for co_job_id, co_load in self.cluster.hosts[hostname].job_loads.items():
+                # Shouldn't check with ourselves
+                if co_job_id != job.job_id:
+                    co_loads.append(co_load)
+
+        if co_loads != []:
+            # If we do not have knowledge of the job's speedup when co-allocated
+            # to the specific co-job then use the average speedup
+            speedup = self.db.speedups.row_min(job.load_index, co_loads, default=job.avg_speedup)
+            if speedup < worst_speedup:
+                worst_speedup = speedup
+
+        return worst_speedup
+
+    def calculate_job_rem_time(self, job: Job) -> None:
+
+        self.debug_logger.debug("Calculating remaining execution time of job %d:%s with inital value %s", job.job_id, job.job_name, job.remaining_time)
+
+        worst_speedup = self.calculate_job_worst_speedup(job)
+
+        if worst_speedup is None:
             # It is executing as compact
             return
 
-        for hostname in job.assigned_hosts:
-            for co_job_signature in list(self.cluster.hosts[hostname].jobs.keys()):
+        # Recalculate the remaining time of the job and the current speedup
+        # only if the worst speedup is different from the current speedup
+        if job.sim_speedup != worst_speedup:
+            job.remaining_time *= (job.sim_speedup / worst_speedup)
+            job.sim_speedup = worst_speedup
 
-                # Shouldn't check with ourselves
-                if job.get_signature() == co_job_signature:
-                    continue
+        self.debug_logger.debug("Calculated remaining execution time of job %d:%s with new value %s", job.job_id, job.job_name, job.remaining_time)
 
-                neighbors_exist = True
+    def mark_host_dirty(self, hostname: str) -> None:
+        """The co-runners changed for every job executing on a host
+        """
+        self._dirty_handles.update(self.cluster.hosts[hostname].jobs.keys())
 
-                co_job_name = co_job_signature.split(":")[-1]
-                speedup = self.db.heatmap[job.job_name][co_job_name]
-                # If we do not have knowledge of the job's speedup when co-allocated
-                # to the specific co-job then use the average speedup
-                if speedup is None:
-                    speedup = job.avg_speedup
-                if speedup < worst_speedup:
-                    worst_speedup = speedup
+    def pop_dirty_jobs(self) -> list[Job]:
+        """Return and forget the executing jobs whose speedup needs to be
+        recalculated
+        """
+        dirty_jobs = [self.cluster.jobs[job_id] for job_id in self._dirty_handles]
+        self._dirty_handles.clear()
+        return dirty_jobs
+
+    # Event calendar computations
+    def push_job_events(self, job: Job) -> None:
+        """Store the projected finish time and the abort deadline of a job
+        that started executing in the event calendar
+        """
+        self._synced_steps[job.job_id] = len(self._time_steps)
+        self.push_finish_event(job)
 
-        # Recalculate the remaining time of the job and the current speedup
+        heappush(self._abort_events, (job.start_time + job.wall_time * (1 + self.wall_time_ratio), self._event_seq, job))
+        self._event_seq += 1
 
-        # If there exist neighbors beside the job in one of the hosts then
-        # co-execution
-        if neighbors_exist:
-            # Change only if the worst speedup is different from the current
-            # speedup of the job
-            if job.sim_speedup != worst_speedup:
-                job.remaining_time *= (job.sim_speedup / worst_speedup)
-                job.sim_speedup = worst_speedup
-        # If no neighbors exist
-        else:
-            # If it is spread allocated check to change the rem time
-            if spread_allocation:
-                # Change if it had neighbors but now it is executing alone
-                if job.sim_speedup != worst_speedup:
-                    job.remaining_time *= (job.sim_speedup / worst_speedup)
-                    job.sim_speedup = worst_speedup
+    def push_finish_event(self, job: Job) -> None:
+        """Store the projected finish time of an up to date executing job; its
+        previous entry in the heap becomes stale
+        """
+        self._finish_seqs[job.job_id] = self._event_seq
+        heappush(self._finish_events, (self.cluster.makespan + job.remaining_time, self._event_seq, job))
+        self._event_seq += 1
 
-        self.debug_logger.debug(f"Calculated remaining execution time of job {job.get_signature()} with new value {job.remaining_time}")
+    def sync_job_time(self, job: Job) -> None:
+        """Subtract from the remaining time of an executing job the time steps
+        advanced since it was last brought up to date
+        """
+        synced = self._synced_steps[job.job_id]
+        if synced < len(self._time_steps):
+            job.remaining_time = reduce(sub, islice(self._time_steps, synced, None), job.remaining_time)
+            self._synced_steps[job.job_id] = len(self._time_steps)
+
+    def clear_time_steps(self) -> None:
+        """Bring every executing job up to date and clear the log of time
+        steps
+        """
+        for job in self.cluster.execution_list:
+            self.sync_job_time(job)
+        self._time_steps = list()
+        self._synced_steps = dict.fromkeys(self._synced_steps, 0)
+
+    def rekey_job_event(self, job: Job) -> None:
+        """Recalculate the projected finish time of an executing job if its
+        speedup changed
+        """
+
+        worst_speedup = self.calculate_job_worst_speedup(job)
+
+        # Nothing to re-key if it executes as compact or its speedup remained
+        # the same
+        if worst_speedup is None or job.sim_speedup == worst_speedup:
+            return
+
+        self.sync_job_time(job)
+        job.remaining_time *= (job.sim_speedup / worst_speedup)
+        job.sim_speedup = worst_speedup
+
+        self.push_finish_event(job)
+
+    def pop_next_finishing(self) -> list[Job]:
+        """Remove from the event calendar and bring up to date the executing
+        jobs that may finish first. The projected finish times drift from the
+        remaining times by the rounding of the additions, so every job
+        projected to finish within a relative 1e-7 of the earliest one is
+        taken.
+        """
+        jobs: list[Job] = list()
+        limit = inf
+
+        while self._finish_events != []:
+            finish_time, seq, job = self._finish_events[0]
+            if self._finish_seqs.get(job.job_id) == seq:
+                if limit == inf:
+                    limit = finish_time + 1e-7 * max(abs(finish_time), 1)
+                elif finish_time > limit:
+                    break
+                self.sync_job_time(job)
+                jobs.append(job)
+            heappop(self._finish_events)
+
+        return jobs
+
+    # Struct-of-arrays computations
+    def soa_append_job(self, job: Job) -> None:
+        """Mirror a job that started executing at the end of the arrays
+        """
+
+        # Double the capacity of the arrays if they are full
+        if self._soa_size == len(self._soa_remaining):
+            self._soa_jobs = np.concatenate((self._soa_jobs, np.empty_like(self._soa_jobs)))
+            self._soa_ids = np.concatenate((self._soa_ids, np.zeros_like(self._soa_ids)))
+            self._soa_remaining = np.concatenate((self._soa_remaining, np.zeros_like(self._soa_remaining)))
+            self._soa_start = np.concatenate((self._soa_start, np.zeros_like(self._soa_start)))
+            self._soa_wall = np.concatenate((self._soa_wall, np.zeros_like(self._soa_wall)))
+
+        idx = self._soa_size
+        self._soa_jobs[idx] = job
+        self._soa_ids[idx] = job.job_id
+        self._soa_remaining[idx] = job.remaining_time
+        self._soa_start[idx] = job.start_time
+        self._soa_wall[idx] = job.wall_time
+        self._soa_index[job.job_id] = idx
+        self._soa_size += 1
+
+    def soa_rescale_job(self, job: Job) -> None:
+        """Recalculate the remaining time of a mirrored job if its speedup
+        changed
+        """
+
+        worst_speedup = self.calculate_job_worst_speedup(job)
+
+        if worst_speedup is None or job.sim_speedup == worst_speedup:
+            return
+
+        self._soa_remaining[self._soa_index[job.job_id]] *= (job.sim_speedup / worst_speedup)
+        job.sim_speedup = worst_speedup
 
     def deploy_job_to_host(self, hostname: str, job: Job, psets: list[ProcSet]) -> None:
 
@@ -208,31 +475,28 @@ class ComputeEngine:
         # Store hostname in job's registry
         job.assigned_hosts.append(hostname)
 
-        # Add job signature to the host and the processor set it allocates
-        self.cluster.hosts[hostname].jobs.update({
-            job.get_signature(): psets
-        })
+        # Add job handle to the host and the processor set it allocates
+        host = self.cluster.materialise_host(hostname)
+        host.add_job(job.job_id, job.load_index, psets)
+        self.mark_host_dirty(hostname)
 
         # Remove psets from host and decrease the number of idle cores in cluster
-        for i, socket_pset in enumerate(self.cluster.hosts[hostname].sockets):
-            socket_pset -= psets[i]
-            self.cluster.idle_cores -= len(psets[i])
-
-        # Log the event
-        self.logger.log(evts.JobStart, msg=job.get_signature(), job=job, psets=psets, hostname=hostname)
-        self.logger.log(evts.JobDeployedToHost, msg=f"{job.get_signature()} in-> {hostname}")
+        self.cluster.idle_cores -= host.allocate(psets)
+        self.cluster.update_host_free_cores(hostname)
+        self.cluster.profile_host(hostname)
 
-        self.debug_logger.debug(f"Job {job.get_signature()} is deployed to host {hostname}")
-
-    def deploy_job_to_hosts(self, suitable_hosts, job) -> None:
+        self.debug_logger.debug("Job %d:%s is deployed to host %s", job.job_id, job.job_name, hostname)
 
-        self.debug_logger.debug(f"Job {job.get_signature()} is being deployed")
+    def place_job(self, suitable_hosts, job) -> None:
+        """Start executing a job on the cores of its hosts; the job leaves the
+        waiting queue at once and is logged when the placement is applied
+        """
 
-        # Remove job from cluster's waiting queue
-        self.cluster.waiting_queue.remove(job)
+        self.debug_logger.debug("Job %d:%s is being deployed", job.job_id, job.job_name)
 
         job.current_state = JobState.EXECUTING
         job.start_time = self.cluster.makespan
+        self.cluster.profile_job_start(job, len(suitable_hosts))
 
         for hostname, psets in suitable_hosts:
             # Deploy job
@@ -243,45 +507,244 @@ class ComputeEngine:
         # Add job to the executing list
         self.cluster.execution_list.append(job)
 
-        self.debug_logger.debug(f"Job {job.get_signature()} has deployed for execution")
+        # The rest of a scheduling pass doesn't see the job in the waiting
+        # queue; its slot is emptied without compacting the slots, so that
+        # an iteration of the queue is not disturbed
+        self.cluster.waiting_queue.empty_slot(job)
+
+    def apply_placements(self, placements) -> None:
+        """Finish the deployment of the jobs placed by place_job() in a
+        scheduling pass: they are logged together and their execution is
+        simulated. Each placement is a job and its (hostname, psets) pairs.
+        """
+
+        # The placed jobs already left the waiting queue
+        self.cluster.waiting_queue.compact_if_sparse()
+
+        # Log the events
+        self.logger.log_job_starts(placements)
+
+        for job, suitable_hosts in placements:
+
+            if self.logger.debug:
+                for hostname, _ in suitable_hosts:
+                    self.logger.log(evts.JobDeployedToHost, msg=f"{job.get_signature()} in-> {hostname}")
+
+            self.cluster.register_job(job)
+
+            if self.backend == "events":
+                self.push_job_events(job)
+            elif self.backend == "numpy":
+                self.soa_append_job(job)
+
+            self.debug_logger.debug("Job %d:%s has deployed for execution", job.job_id, job.job_name)
+
+    def deploy_job_to_hosts(self, suitable_hosts, job) -> None:
+        self.place_job(suitable_hosts, job)
+        self.apply_placements([(job, suitable_hosts)])
 
     def clean_job_from_hosts(self, job: Job) -> None:
 
-        self.debug_logger.debug(f"Job {job.get_signature()} is being cleaned from allocated hosts")
+        self.debug_logger.debug("Job %d:%s is being cleaned from allocated hosts", job.job_id, job.job_name)
 
         # Set the finish time of the job
         job.finish_time = self.cluster.makespan
-        
+        self.cluster.profile_job_finish(job)
+        self.cluster.capacity_epoch += 1
+
         if job.current_state not in (JobState.ABORTED, JobState.FAILED):
             job.current_state = JobState.FINISHED
 
         # Clean job and return resources back to host
         for hostname in job.assigned_hosts:
             # Log the event
-            self.logger.log(evts.JobCleanedFromHost, msg=f"{hostname} out-> {job.get_signature()}")
+            if self.logger.debug:
+                self.logger.log(evts.JobCleanedFromHost, msg=f"{hostname} out-> {job.get_signature()}")
 
-            # Return the allocated processors of a job to each host 
-            # and add the number of returned cores to idle cores of cluster
-            for i, pset in enumerate(self.cluster.hosts[hostname].jobs[job.get_signature()]):
-                self.cluster.hosts[hostname].sockets[i] = self.cluster.hosts[hostname].sockets[i].union(pset)
-                self.cluster.idle_cores += len(pset)
+            host = self.cluster.hosts[hostname]
 
-            # Remove job signature from host
-            self.cluster.hosts[hostname].jobs.pop(job.get_signature())
+            # Remove job handle from host, return its allocated processors
+            # and add the number of returned cores to idle cores of cluster
+            self.cluster.idle_cores += host.release(host.remove_job(job.job_id))
+            self.cluster.update_host_free_cores(hostname)
+            self.cluster.profile_host(hostname)
+            self.mark_host_dirty(hostname)
             
             # Change state of host if nothing is executing
-            if len(list(self.cluster.hosts[hostname].jobs.keys())) == 0:
-                self.cluster.hosts[hostname].state = Host.IDLE
+            if len(host.jobs) == 0:
+                host.state = Host.IDLE
+                self.cluster.fold_host(hostname)
  
+        # The job is not executing anymore
+        self.cluster.unregister_job(job)
+        self._dirty_handles.discard(job.job_id)
+
         # Log the event
-        self.logger.log(evts.JobFinish, msg=f"{job.get_signature()}", job=job)
+        self.logger.log(evts.JobFinish, job=job)
 
-        self.debug_logger.debug(f"Job {job.get_signature()} has been cleaned from allocated hosts")
+        self.debug_logger.debug("Job %d:%s has been cleaned from allocated hosts", job.job_id, job.job_name)
 
 
     # Simulation loop computations
+    def goto_next_sim_event(self) -> None:
+
+        self.debug_logger.debug("Begin advancing the event calendar")
+
+        # Re-key the jobs whose speedup may have changed
+        for job in self.pop_dirty_jobs():
+            self.rekey_job_event(job)
+
+        # The jobs that may finish first and the minimum remaining execution
+        # time among them
+        next_jobs = self.pop_next_finishing()
+        min_rem_time = inf
+        for job in next_jobs:
+            if job.remaining_time < min_rem_time:
+                min_rem_time = job.remaining_time
+
+        # Find the minimum remaining time for a job to show up in the waiting
+        # queue of the cluster
+        next_job = self.db.next_preloaded_job()
+        if next_job is not None:
+            showup_time = next_job.submit_time - self.cluster.makespan
+            if showup_time > 0 and showup_time < min_rem_time:
+                min_rem_time = showup_time
+
+        if min_rem_time <= 0:
+            self.debug_logger.error(f"The minimum next simulation step time is {min_rem_time} <=0")
+        else:
+            self.debug_logger.debug(f"The minimum next simulation step time is {min_rem_time} seconds")
+        # Guard the execution
+        assert min_rem_time > 0
+
+        if min_rem_time == inf and (self.cluster.waiting_queue != [] or self.db.preloaded_queue != []):
+            self.debug_logger.error(f"There are jobs in the preloaded queue or waiting queue that have not being deployed for execution")
+            raise RuntimeError
+
+        # Forward the time of the execution
+        self.cluster.makespan += min_rem_time
+        self._time_steps.append(min_rem_time)
+        self.debug_logger.debug(f"The new makespan is {self.cluster.makespan}")
+
+        # Log the event
+        self.logger.log(evts.CompEngineNextTimeStep, msg=f"{min_rem_time}")
+
+        # Jobs that surpassed their wall time are aborted
+        ended: dict[int, Job] = dict()
+        while self._abort_events != [] and self._abort_events[0][0] <= self.cluster.makespan:
+            _, _, job = heappop(self._abort_events)
+            if job.job_id in self._finish_seqs:
+                job.current_state = JobState.ABORTED
+                ended[job.job_id] = job
+
+        # "Execute" the jobs that may finish; the rest go back to the calendar
+        for job in next_jobs:
+            self.sync_job_time(job)
+            if job.remaining_time == 0:
+                ended[job.job_id] = job
+            else:
+                self.push_finish_event(job)
+
+        # Remove/clean any jobs that ended in the order of the execution list
+        for job in self.cluster.execution_list.in_order(ended.values()):
+            job.remaining_time = 0
+            self._finish_seqs.pop(job.job_id)
+            self._synced_steps.pop(job.job_id)
+            self.clean_job_from_hosts(job)
+
+        self.cluster.execution_list.remove_many(ended.values())
+
+        if len(self._time_steps) > max(64, len(self.cluster.execution_list)):
+            self.clear_time_steps()
+
+        self.debug_logger.debug("Finished advancing the event calendar")
+
+    def goto_next_sim_soa(self) -> None:
+
+        self.debug_logger.debug("Begin executing the jobs in the execution arrays")
+
+        # Recalculate the remaining time of jobs whose co-runners changed
+        for job in self.pop_dirty_jobs():
+            self.soa_rescale_job(job)
+
+        size = self._soa_size
+        remaining = self._soa_remaining[:size]
+
+        # Find the minimum remaining execution time of the jobs currently executing
+        min_rem_time = float(remaining.min()) if size > 0 else inf
+
+        # Find the minimum remaining time for a job to show up in the waiting
+        # queue of the cluster
+        next_job = self.db.next_preloaded_job()
+        if next_job is not None:
+            showup_time = next_job.submit_time - self.cluster.makespan
+            if showup_time > 0 and showup_time < min_rem_time:
+                min_rem_time = showup_time
+
+        if min_rem_time <= 0:
+            self.debug_logger.error(f"The minimum next simulation step time is {min_rem_time} <=0")
+        else:
+            self.debug_logger.debug(f"The minimum next simulation step time is {min_rem_time} seconds")
+        # Guard the execution
+        assert min_rem_time > 0
+
+        if min_rem_time == inf and (self.cluster.waiting_queue != [] or self.db.preloaded_queue != []):
+            self.debug_logger.error(f"There are jobs in the preloaded queue or waiting queue that have not being deployed for execution")
+            raise RuntimeError
+
+        # Forward the time of the execution
+        self.cluster.makespan += min_rem_time
+        self.debug_logger.debug(f"The new makespan is {self.cluster.makespan}")
+
+        # Log the event
+        self.logger.log(evts.CompEngineNextTimeStep, msg=f"{min_rem_time}")
+
+        # "Execute" the jobs
+        remaining -= min_rem_time
+
+        # If jobs surpassed their wall time then abort them
+        aborted = (self._soa_start[:size] + self._soa_wall[:size] * (1 + self.wall_time_ratio)) <= self.cluster.makespan
+        remaining[aborted] = 0
+
+        finished = (remaining == 0)
+        if not finished.any():
+            self.debug_logger.debug("Finished executing the jobs in the execution arrays")
+            return
+
+        # Remove/clean any jobs that finished execution
+        jobs = self._soa_jobs[:size]
+        finished_jobs: list[Job] = list()
+        for idx in np.flatnonzero(finished).tolist():
+            job: Job = jobs[idx]
+            if aborted[idx]:
+                job.current_state = JobState.ABORTED
+            job.remaining_time = 0
+            self.clean_job_from_hosts(job)
+            finished_jobs.append(job)
+
+        # Compact the arrays to the jobs that are still executing
+        keep = ~finished
+        new_size = int(keep.sum())
+        self._soa_jobs[:new_size] = jobs[keep]
+        self._soa_jobs[new_size:size] = None
+        self._soa_ids[:new_size] = self._soa_ids[:size][keep]
+        self._soa_remaining[:new_size] = remaining[keep]
+        self._soa_start[:new_size] = self._soa_start[:size][keep]
+        self._soa_wall[:new_size] = self._soa_wall[:size][keep]
+        self._soa_size = new_size
+        self._soa_index = dict(zip(self._soa_ids[:new_size].tolist(), range(new_size)))
+
+        self.cluster.execution_list.remove_many(finished_jobs)
+
+        self.debug_logger.debug("Finished executing the jobs in the execution arrays")
+
     def goto_next_sim_state(self) -> None:
 
+        if self.backend == "events":
+            return self.goto_next_sim_event()
+        elif self.backend == "numpy":
+            return self.goto_next_sim_soa()
+
         self.debug_logger.debug("Begin executing the jobs in the execution list")
 
         #NOTE: consider adding multithreading to
@@ -291,24 +754,23 @@ class ComputeEngine:
         # 3) Finding the minimum showup time in the preloaded queue (this is a more preferrable action
         # at least in the beginning of a simulation)
 
-        # Recalculate the remaining time of jobs
+        # Recalculate the remaining time of jobs whose co-runners changed
+        for job in self.pop_dirty_jobs():
+            self.calculate_job_rem_time(job)
 
         # Find the minimum remaining execution time of the jobs currently executing
         min_rem_time = inf
         for job in self.cluster.execution_list:
-            self.calculate_job_rem_time(job)
             if job.remaining_time < min_rem_time:
                 min_rem_time = job.remaining_time
 
         # Find the minimum remaining time for a job to show up in the waiting
-        # queue of the cluster
-        for job in self.db.preloaded_queue:
-            showup_time = job.submit_time - self.cluster.makespan
+        # queue of the cluster; they are already sorted by increasing arrival time
+        next_job = self.db.next_preloaded_job()
+        if next_job is not None:
+            showup_time = next_job.submit_time - self.cluster.makespan
             if showup_time > 0 and showup_time < min_rem_time:
                 min_rem_time = showup_time
-            else:
-                # They are already sorted by increasing arrival time
-                break
         
         if min_rem_time <= 0:
             self.debug_logger.error(f"The minimum next simulation step time is {min_rem_time} <=0")
@@ -318,12 +780,10 @@ class ComputeEngine:
         assert min_rem_time > 0
 
         if min_rem_time == inf and (self.cluster.waiting_queue != [] or self.db.preloaded_queue != []):
-            print()
-            print(self.cluster.get_idle_cores())
-            print("PREL", self.db.preloaded_queue)
-            print("WAIT", self.cluster.waiting_queue)
-            print("EXEC", self.cluster.execution_list)
-            print()
+            self.debug_logger.debug("Idle cores: %s", self.cluster.get_idle_cores())
+            self.debug_logger.debug("Preloaded queue: %s", self.db.preloaded_queue[self.db.preloaded_cursor:])
+            self.debug_logger.debug("Waiting queue: %s", self.cluster.waiting_queue)
+            self.debug_logger.debug("Execution list: %s", self.cluster.execution_list)
             self.debug_logger.error(f"There are jobs in the preloaded queue or waiting queue that have not being deployed for execution")
             raise RuntimeError
 
@@ -335,7 +795,7 @@ class ComputeEngine:
         self.logger.log(evts.CompEngineNextTimeStep, msg=f"{min_rem_time}")
 
         # "Execute" the jobs
-        execution_list: list[Job] = list()
+        finished_jobs: list[Job] = list()
 
         #INFO: consider multithreading the deletion of jobs
         #WARN: pay attention to how the jobs are deleted from the host. 
@@ -354,11 +814,10 @@ class ComputeEngine:
 
             if job.remaining_time == 0:
                 self.clean_job_from_hosts(job)
-            else:
-                execution_list.append(job)
+                finished_jobs.append(job)
 
-        # Assign new execution list to cluster
-        self.cluster.execution_list = execution_list
+        # Remove the finished jobs from the execution list of the cluster
+        self.cluster.execution_list.remove_many(finished_jobs)
 
         self.debug_logger.debug("Finished executing the jobs in the execution list")
 
@@ -371,18 +830,39 @@ class ComputeEngine:
         # Deploy to waiting queue any preloaded jobs that remain
         self.debug_logger.debug("Loading any job(s) that arrived in the waiting queue")
         self.load_in_waiting_queue()
+
+        # The jobs may run longer than their wall time
+        if self.wall_time_ratio > 0:
+            self.cluster.profile_overdue_jobs(self.cluster.makespan, self.wall_time_ratio)
         
         # Check if there are any jobs left waiting
         if self.cluster.waiting_queue != []:
 
-            # Deploy/Submit jobs to the execution list
-            deployed = self.scheduler.deploy()
+            if self.scheduler.bulk_placement:
+
+                # Deploy/Submit jobs to the execution list
+                placements = self.scheduler.deploy_placements()
+                self.apply_placements(placements)
+                deployed = placements != []
 
-            # If the backfilling policy of a scheduler is enabled
-            if self.scheduler.backfill_enabled:
+                # If the backfilling policy of a scheduler is enabled
+                if self.scheduler.backfill_enabled:
+
+                    # Execute the backfilling algorithm
+                    placements = self.scheduler.backfill_placements()
+                    self.apply_placements(placements)
+                    deployed |= placements != []
+
+            else:
 
-                # Execute the backfilling algorithm
-                deployed |= self.scheduler.backfill()
+                # Deploy/Submit jobs to the execution list
+                deployed = self.scheduler.deploy()
+
+                # If the backfilling policy of a scheduler is enabled
+                if self.scheduler.backfill_enabled:
+
+                    # Execute the backfilling algorithm
+                    deployed |= self.scheduler.backfill()
 
         # If deployed restart scheduling procedure
         # if deployed:
@@ -394,5 +874,17 @@ class ComputeEngine:
         # 2. There are no jobs in the waiting queue but there are in the 
         #    queue preloaded
         self.goto_next_sim_state()
+
+        # The simulation ended
+        if self.db.preloaded_queue == [] and self.cluster.waiting_queue == [] and self.cluster.execution_list == []:
+            self.scheduler.teardown()
         
         self.debug_logger.debug("End of a simulation step")
+
+    def simulate_until(self, makespan: float) -> None:
+        """Execute simulation steps until the simulation time reaches makespan
+        or all the jobs have finished
+        """
+        while (self.db.preloaded_queue != [] or self.cluster.waiting_queue != [] or self.cluster.execution_list != [])\
+                and self.cluster.makespan < makespan:
+            self.sim_step()
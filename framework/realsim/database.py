@@ -13,7 +13,7 @@ the jobs will be addressed by their ids.
 
 import os
 import sys
-from typing import Optional, Protocol
+from typing import Iterable, Iterator, Optional, Protocol, Union
 
 # Set the root directory of the api library
 sys.path.append(os.path.abspath(os.path.join(
@@ -30,8 +30,7 @@ sys.path.append(os.path.abspath(os.path.join(
 # Import library components
 from realsim.jobs.jobs import Job
 from realsim.jobs.utils import deepcopy_list
-
-Heatmap = dict[str,dict[str, Optional[float]]]
+from realsim.heatmap import Heatmap, HeatmapView, SpeedupMatrix
 
 # Define the inference engine
 class InferenceEngine(Protocol):
@@ -42,29 +41,127 @@ class InferenceEngine(Protocol):
 class Database:
 
     def __init__(self, 
-                 jobs_set: list[Job], 
+                 jobs_set: Union[list[Job], Iterable[Job]], 
                  heatmap: Heatmap = dict(),
                  engine: Optional[InferenceEngine] = None,
                  lm = None):
-        self.preloaded_queue = deepcopy_list(jobs_set)
-        self.heatmap = heatmap
+        # A list of jobs is preloaded as a whole while any other iterable is
+        # treated as a stream of jobs sorted by their submit time; the streamed
+        # jobs are pulled in the preloaded queue while the simulation advances
+        self.jobs_stream: Optional[Iterable[Job]] = None
+        self._jobs_iter: Optional[Iterator[Job]] = None
+        self._jobs_pulled: int = 0
+        if isinstance(jobs_set, list):
+            self.preloaded_queue = deepcopy_list(jobs_set)
+        else:
+            self.preloaded_queue = list()
+            self.jobs_stream = jobs_set
+        # Index of the next job to arrive in the preloaded queue
+        self.preloaded_cursor: int = 0
         self.engine = engine
         self.lm = lm
 
+        # The speedups are stored in a dense matrix indexed by the integer ids
+        # of the load names; the heatmap is a dict-like view of the matrix
+        self.set_heatmap(heatmap)
+
     def pop(self, queue: list[Job]) -> Job:
         job: Job = queue[0]
         queue.remove(job)
         return job
 
+    def next_preloaded_job(self) -> Optional[Job]:
+        """Return the next job to arrive without removing it from the
+        preloaded queue
+        """
+        if self.preloaded_cursor < len(self.preloaded_queue):
+            return self.preloaded_queue[self.preloaded_cursor]
+        return None
+
+    def pop_preloaded_jobs(self, until: float) -> list[Job]:
+        """Remove and return the jobs of the (sorted by submit time) preloaded
+        queue that arrive until a certain time
+        """
+        start = self.preloaded_cursor
+        end = start
+        queue_len = len(self.preloaded_queue)
+
+        while end < queue_len and self.preloaded_queue[end].submit_time <= until:
+            end += 1
+
+        jobs = self.preloaded_queue[start:end]
+        self.preloaded_cursor = end
+
+        # Drop the arrived jobs when they are at least half of the queue; the
+        # preloaded queue becomes empty when all jobs have arrived
+        if 2 * self.preloaded_cursor >= queue_len:
+            del self.preloaded_queue[:self.preloaded_cursor]
+            self.preloaded_cursor = 0
+
+        return jobs
+
+    def preloaded_jobs_num(self) -> int:
+        """Return the number of jobs that have not arrived yet (for a stream
+        only the ones already pulled in the preloaded queue)
+        """
+        return len(self.preloaded_queue) - self.preloaded_cursor
+
+    def pull_streamed_job(self) -> Optional[Job]:
+        """Return the next job of the stream or None if the stream is exhausted
+        """
+        if self.jobs_stream is None:
+            return None
+
+        if self._jobs_iter is None:
+            self._jobs_iter = iter(self.jobs_stream)
+
+        job = next(self._jobs_iter, None)
+        if job is None:
+            self.jobs_stream = None
+            self._jobs_iter = None
+        else:
+            self._jobs_pulled += 1
+
+        return job
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # An iterator can't be copied; it is recreated from the stream
+        state["_jobs_iter"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Resume the stream after the jobs that were already pulled
+        if self.jobs_stream is not None and self._jobs_pulled > 0:
+            self._jobs_iter = iter(self.jobs_stream)
+            for _ in range(self._jobs_pulled):
+                next(self._jobs_iter)
+
+    def set_heatmap(self, heatmap: Heatmap) -> None:
+        self.speedups = SpeedupMatrix(heatmap)
+        self.heatmap: HeatmapView = self.speedups.view()
+
+    @property
+    def load_names(self) -> list[str]:
+        return self.speedups.names
+
+    def get_load_index(self, load_name: str) -> int:
+        """Return the integer index of a load name; a new index is given to a
+        load name the first time it is seen
+        """
+        return self.speedups.index(load_name)
+
     def init_heatmap(self):
 
         # If there is an inference engine and the heatmap is not populated
-        # with values
-        if self.engine is not None and self.heatmap == dict():
+        # with values (a stream of jobs is not known in advance)
+        if self.engine is not None and len(self.heatmap) == 0:
 
             # Initialize the heatmap
+            heatmap: Heatmap = dict()
             for job in self.preloaded_queue:
-                self.heatmap[job.job_name] = {}
+                heatmap[job.job_name] = {}
 
             # Get a copy of the preloaded queue
             preloaded_queue = deepcopy_list(self.preloaded_queue)
@@ -82,7 +179,7 @@ class Database:
                     tag = list()
                     tag.extend(job.job_tag)
                     tag.extend(co_job.job_tag)
-                    self.heatmap[job.job_name].update({
+                    heatmap[job.job_name].update({
                             co_job.job_name: self.engine.predict(tag)
                     })
 
@@ -90,9 +187,11 @@ class Database:
                     co_tag = list()
                     co_tag.extend(co_job.job_tag)
                     co_tag.extend(job.job_tag)
-                    self.heatmap[co_job.job_name].update({
+                    heatmap[co_job.job_name].update({
                             job.job_name: self.engine.predict(co_tag)
                     })
 
+            self.set_heatmap(heatmap)
+
     def setup(self):
         self.init_heatmap()
@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 from numpy.random import seed
 from time import time_ns
 from typing import TypeVar, Generic
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 
 from realsim.generators import *
 from math import inf
@@ -37,3 +37,10 @@ class AbstractGenerator(ABC, Generic[T]):
         """Generate a set of num_of_jobs jobs based on the workloads stored in load_manager
         """
         pass
+
+    def generate_jobs_stream(self, arg: T) -> Iterator[Job]:
+        """Generate the jobs one by one sorted by their submit time. Generators
+        that can read their input incrementally should override it so that
+        the whole set is never kept in memory
+        """
+        yield from sorted(self.generate_jobs_set(arg), key=lambda job: job.submit_time)
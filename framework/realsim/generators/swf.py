@@ -1,5 +1,6 @@
 import os
 import sys
+from collections.abc import Iterator
 sys.path.append(os.path.abspath(
     os.path.join(os.path.dirname(__name__), "..", "..")
 ))
@@ -54,3 +55,12 @@ class SWFGenerator(AbstractGenerator[str]):
             raise Exception("The swf file passed was empty.")
         
         return jobs_set
+
+    def generate_jobs_stream(self, arg: str) -> Iterator[Job]:
+        # The records of a SWF file are sorted by their submit time
+        if not os.path.exists(arg):
+            raise Exception("The swf file passed doesn't exist.")
+        with open(arg, "r") as fd:
+            for line in fd:
+                if not line.startswith(";"):
+                    yield self.generate_job(line)
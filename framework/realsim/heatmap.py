@@ -0,0 +1,141 @@
+"""
+Dense representation of the heatmap of speedups. The speedup of a load when
+co-scheduled with a co-load is stored in a float matrix indexed by the integer
+ids of the load names; unknown pairs are NaN.
+"""
+
+from collections.abc import Iterator, Mapping
+from math import nan
+from typing import Optional
+import numpy as np
+
+Heatmap = dict[str, dict[str, Optional[float]]]
+
+
+class SpeedupMatrix:
+
+    def __init__(self, heatmap: Heatmap = dict()):
+
+        # Load names and their integer ids
+        self.names: list[str] = list()
+        self.indices: dict[str, int] = dict()
+
+        # Loads that have a row in the original heatmap
+        self.known: set[int] = set()
+
+        for name, row in heatmap.items():
+            self.index(name)
+            for co_name in row:
+                self.index(co_name)
+
+        # values[load, co_load] = speedup of load when co-scheduled with co_load
+        self.values = np.full((len(self.names), len(self.names)), nan)
+
+        for name, row in heatmap.items():
+            load = self.indices[name]
+            self.known.add(load)
+            for co_name, speedup in row.items():
+                if speedup is not None:
+                    self.values[load, self.indices[co_name]] = speedup
+
+    def index(self, name: str) -> int:
+        """Return the id of a load name; an unknown name gets a new id and its
+        speedups with all the other loads are unknown
+        """
+        if name not in self.indices:
+            self.indices[name] = len(self.names)
+            self.names.append(name)
+
+            if hasattr(self, "values"):
+                size = len(self.names)
+                values = np.full((size, size), nan)
+                values[:size-1, :size-1] = self.values
+                self.values = values
+
+        return self.indices[name]
+
+    def speedup(self, load: int, co_load: int) -> float:
+        """Speedup of a load when co-scheduled with a co-load (NaN if unknown)
+        """
+        return self.values.item(load, co_load)
+
+    def row_speedups(self, load: int) -> list[float]:
+        """The known speedups of a load with every other load
+        """
+        row = self.values[load]
+        return row[~np.isnan(row)].tolist()
+
+    def row_min(self, load: int, co_loads: list[int], default: float = nan) -> float:
+        """Minimum speedup of a load among a set of co-runners; the unknown
+        speedups are replaced by default
+        """
+        if co_loads == []:
+            return nan
+
+        speedups = self.values[load, co_loads]
+        if default == default:
+            speedups = np.where(np.isnan(speedups), default, speedups)
+
+        return float(speedups.min())
+
+    def pair_speedups(self, load: int, co_loads: list[int], default: float = nan) -> np.ndarray:
+        """The speedups of a load with each co-runner followed by the speedups
+        of each co-runner with the load; the unknown speedups are replaced by
+        default
+        """
+        speedups = np.concatenate((self.values[load, co_loads], self.values[co_loads, load]))
+        if default == default:
+            speedups = np.where(np.isnan(speedups), default, speedups)
+
+        return speedups
+
+    def view(self) -> 'HeatmapView':
+        return HeatmapView(self)
+
+
+class HeatmapRowView(Mapping):
+    """Read-only dict-like row of a heatmap with the known speedups of a
+    load; like a dict row, an unknown pair raises KeyError
+    """
+
+    def __init__(self, matrix: SpeedupMatrix, load: int):
+        self.matrix = matrix
+        self.load = load
+
+    def __getitem__(self, co_name: str) -> float:
+        speedup = self.matrix.speedup(self.load, self.matrix.indices[co_name])
+        if speedup != speedup:
+            raise KeyError(co_name)
+        return speedup
+
+    def known(self) -> np.ndarray:
+        """The ids of the co-loads with a known speedup
+        """
+        return np.flatnonzero(~np.isnan(self.matrix.values[self.load]))
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.matrix.names[co_load] for co_load in self.known().tolist())
+
+    def __len__(self) -> int:
+        return len(self.known())
+
+
+class HeatmapView(Mapping):
+    """Read-only dict-of-dicts view of a speedup matrix for the code that
+    uses the heatmap by load names
+    """
+
+    def __init__(self, matrix: SpeedupMatrix):
+        self.matrix = matrix
+
+    def __getitem__(self, name: str) -> HeatmapRowView:
+        load = self.matrix.indices[name]
+        if load not in self.matrix.known:
+            raise KeyError(name)
+        return HeatmapRowView(self.matrix, load)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self.matrix.names if self.matrix.indices[name] in self.matrix.known)
+
+    def __len__(self) -> int:
+        return len(self.matrix.known)
@@ -38,8 +38,11 @@ class Job:
                  wall_time):
 
         # Important identifiers of the job
+        # The job id is the integer handle of the job inside a simulation
         self.job_id = job_id
         self.job_name = job_name
+        # Index of the job's load name in the database
+        self.load_index: int = -1
         
         # User identifiers
         self.user_id = -1
@@ -122,6 +125,7 @@ class Job:
                    waiting_time=self.waiting_time,
                    wall_time=self.wall_time)
 
+        copy.load_index = self.load_index
         copy.full_socket_nodes = self.full_socket_nodes
         copy.half_socket_nodes = self.half_socket_nodes
         copy.socket_conf = self.socket_conf
@@ -142,4 +146,6 @@ class Job:
         return copy
 
     def get_signature(self) -> str:
+        """Human readable identifier of the job used when exporting results
+        """
         return f"{self.job_id}:{self.job_name}"
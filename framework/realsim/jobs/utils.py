@@ -3,6 +3,11 @@ Utility function used in various instances of the source code for Jobs inside
 containers
 """
 
+from collections.abc import Iterable, Iterator
+from heapq import heapify, heappop, heappush
+from itertools import islice
+from typing import Optional, Union
+
 from .jobs import Job
 
 
@@ -28,3 +33,274 @@ def deepcopy_list(jobs_list: list[Job]):
     # If everything turns out okay then return the new list
     return new_list
 
+
+class JobsStream(Iterable[Job]):
+    """
+    A stream of jobs produced by a generator, sorted by their submit time.
+    Every iteration reads the input of the generator from the beginning, so
+    the generator should produce the same jobs each time (e.g. a trace file)
+    """
+
+    def __init__(self, generator, arg):
+        self.generator = generator
+        self.arg = arg
+
+    def __iter__(self) -> Iterator[Job]:
+        return self.generator.generate_jobs_stream(self.arg)
+
+
+class WaitingQueue:
+    """
+    Queue of waiting jobs in order of arrival keyed by their handle (id).
+    A job is removed in O(1) by leaving an empty slot that is skipped; the
+    slots are compacted when more than half of them are empty. Indexing and
+    slicing return references to the queued jobs and not copies. The number
+    of queued jobs of every load (histogram of load indices) is kept up to
+    date for the schedulers that only depend on the load names.
+
+    A scheduler can also give every queued job a priority key; the jobs are
+    then iterated by descending key and in order of arrival for equal keys
+    without sorting the queue. The keys are kept in a heap where the entries
+    of removed jobs and of replaced keys are skipped; every entry carries a
+    sequence number and only the last entry of a job is valid.
+    """
+
+    def __init__(self, jobs: Iterable[Job] = ()):
+        self.slots: list[Optional[Job]] = list()
+        self.positions: dict[int, int] = dict()
+        self.head = 0
+        # Load index --> number of queued jobs of the load
+        self.load_counts: dict[int, int] = dict()
+
+        # Handle --> priority key of the queued jobs that have one and the
+        # sequence number of its heap entry, the heap of (-key, handle, seq)
+        # entries and the handles of the jobs that arrived since the keys
+        # were last given
+        self.keys: dict[int, float] = dict()
+        self.key_seqs: dict[int, int] = dict()
+        self.seq = 0
+        self.heap: list[tuple[float, int, int]] = list()
+        self.unkeyed_handles: list[int] = list()
+
+        for job in jobs:
+            self.append(job)
+
+    def append(self, job: Job) -> None:
+        if job.job_id in self.positions:
+            raise RuntimeError(f"Job {job.job_id} is already in the waiting queue")
+        self.positions[job.job_id] = len(self.slots)
+        self.slots.append(job)
+        self.load_counts[job.load_index] = self.load_counts.get(job.load_index, 0) + 1
+        self.unkeyed_handles.append(job.job_id)
+
+        # Forget the jobs that left the queue if nobody asks for the keys
+        if len(self.unkeyed_handles) > 2 * len(self.positions) + 16:
+            self.unkeyed_handles = [handle for handle in self.unkeyed_handles
+                                    if handle in self.positions and handle not in self.keys]
+
+    def remove(self, job: Job) -> None:
+        """Remove the queued job that has the same handle as job
+        """
+        self.empty_slot(job)
+        self.compact_if_sparse()
+
+    def remove_many(self, jobs: Iterable[Job]) -> None:
+        """Remove a number of queued jobs and compact the slots once
+        """
+        for job in jobs:
+            self.empty_slot(job)
+        self.compact_if_sparse()
+
+    def empty_slot(self, job: Job) -> None:
+        """Empty the slot of a queued job without compacting the slots
+        """
+        pos = self.positions.pop(job.job_id, None)
+        if pos is None:
+            raise ValueError(f"Job {job.job_id} is not in the waiting queue")
+        queued = self.slots[pos]
+        self.slots[pos] = None
+        self.keys.pop(job.job_id, None)
+        self.key_seqs.pop(job.job_id, None)
+
+        if self.load_counts[queued.load_index] == 1:
+            del self.load_counts[queued.load_index]
+        else:
+            self.load_counts[queued.load_index] -= 1
+
+        while self.head < len(self.slots) and self.slots[self.head] is None:
+            self.head += 1
+
+    def unkeyed(self) -> list[Job]:
+        """The queued jobs that arrived since the last call and have no
+        priority key yet, in order of arrival
+        """
+        jobs = [self.slots[self.positions[handle]] for handle in self.unkeyed_handles
+                if handle in self.positions and handle not in self.keys]
+        self.unkeyed_handles = list()
+        return jobs
+
+    def set_key(self, job: Job, key: float) -> None:
+        """Give or change the priority key of a queued job
+        """
+        if self.keys.get(job.job_id) == key:
+            return
+
+        self.keys[job.job_id] = key
+        self.seq += 1
+        self.key_seqs[job.job_id] = self.seq
+        heappush(self.heap, (-key, job.job_id, self.seq))
+
+        # Too many entries are skipped
+        if len(self.heap) > 2 * len(self.keys) + 16:
+            self.rebuild_heap()
+
+    def set_keys(self, keyed_jobs: Iterable[tuple[Job, float]]) -> None:
+        """Replace the priority keys of all the queued jobs
+        """
+        self.keys = {job.job_id: key for job, key in keyed_jobs}
+        self.unkeyed_handles = list()
+        self.rebuild_heap()
+
+    def clear_keys(self) -> None:
+        self.keys = dict()
+        self.key_seqs = dict()
+        self.heap = list()
+        self.unkeyed_handles = list(self.positions)
+
+    def rebuild_heap(self) -> None:
+        self.key_seqs = dict()
+        self.heap = list()
+        for handle, key in self.keys.items():
+            self.seq += 1
+            self.key_seqs[handle] = self.seq
+            self.heap.append((-key, handle, self.seq))
+        heapify(self.heap)
+
+    def by_key(self) -> Iterator[Job]:
+        """The queued jobs that have a priority key by descending key and then
+        by arrival. The heap is walked from its root without being modified,
+        so jobs can be removed from the queue during the iteration and only
+        the jobs that are reached are ordered.
+        """
+        heap = self.heap
+        frontier = [(heap[0], 0)] if heap else []
+
+        while frontier:
+            (neg_key, handle, seq), idx = heappop(frontier)
+
+            for child in (2 * idx + 1, 2 * idx + 2):
+                if child < len(heap):
+                    heappush(frontier, (heap[child], child))
+
+            # Removed jobs and replaced keys are skipped
+            if self.key_seqs.get(handle) == seq:
+                yield self.slots[self.positions[handle]]
+
+    def compact_if_sparse(self) -> None:
+        """Compact the slots when more than half of them are empty
+        """
+        if 2 * len(self.positions) < len(self.slots) - self.head:
+            self.compact()
+
+    def compact(self) -> None:
+        self.slots = [job for job in self.slots[self.head:] if job is not None]
+        self.positions = {job.job_id: pos for pos, job in enumerate(self.slots)}
+        self.head = 0
+
+    def __contains__(self, job) -> bool:
+        return isinstance(job, Job) and job.job_id in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator[Job]:
+        return (job for job in islice(self.slots, self.head, None) if job is not None)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Job, list[Job]]:
+        if isinstance(key, slice):
+            if key.step is not None or (key.start or 0) < 0 or (key.stop is not None and key.stop < 0):
+                return list(self)[key]
+            return list(islice(self, key.start, key.stop))
+
+        if key == 0 and self.positions:
+            return self.slots[self.head]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("waiting queue index out of range")
+        return next(islice(self, key, None))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, WaitingQueue)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"WaitingQueue({list(self)})"
+
+
+class ExecutionList:
+    """
+    List of executing jobs in order of deployment keyed by their handle (id).
+    A job is removed in O(1) and the rest keep their order. Indexing and
+    slicing return references to the executing jobs and not copies.
+    """
+
+    def __init__(self, jobs: Iterable[Job] = ()):
+        self.jobs: dict[int, Job] = dict()
+        # Handle --> order of deployment of the executing jobs
+        self.orders: dict[int, int] = dict()
+        self.counter = 0
+
+        for job in jobs:
+            self.append(job)
+
+    def append(self, job: Job) -> None:
+        if job.job_id in self.jobs:
+            raise RuntimeError(f"Job {job.job_id} is already in the execution list")
+        self.jobs[job.job_id] = job
+        self.orders[job.job_id] = self.counter
+        self.counter += 1
+
+    def remove(self, job: Job) -> None:
+        """Remove the executing job that has the same handle as job
+        """
+        if self.jobs.pop(job.job_id, None) is None:
+            raise ValueError(f"Job {job.job_id} is not in the execution list")
+        del self.orders[job.job_id]
+
+    def remove_many(self, jobs: Iterable[Job]) -> None:
+        for job in jobs:
+            self.remove(job)
+
+    def in_order(self, jobs: Iterable[Job]) -> list[Job]:
+        """A number of executing jobs in their order in the list
+        """
+        return sorted(jobs, key=lambda job: self.orders[job.job_id])
+
+    def __contains__(self, job) -> bool:
+        return isinstance(job, Job) and job.job_id in self.jobs
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self.jobs.values())
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Job, list[Job]]:
+        if isinstance(key, slice):
+            return list(self)[key]
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("execution list index out of range")
+        return next(islice(self, key, None))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, ExecutionList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ExecutionList({list(self)})"
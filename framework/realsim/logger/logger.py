@@ -25,6 +25,21 @@ if TYPE_CHECKING:
     from realsim.scheduler.scheduler import Scheduler
 
 
+def union_procsets(psets: list[ProcSet]) -> ProcSet:
+    """The union of a number of processor sets; every union of ProcSet walks
+    the intervals of both sets, so the sets are merged in pairs to keep each
+    union small
+    """
+    if psets == []:
+        return ProcSet()
+
+    while len(psets) > 1:
+        psets = [psets[idx].union(psets[idx+1]) if idx + 1 < len(psets) else psets[idx]
+                 for idx in range(0, len(psets), 2)]
+
+    return psets[0]
+
+
 class Logger(object):
     """
     Logs important events of the simulation into the memory
@@ -51,24 +66,28 @@ class Logger(object):
 
         if self.debug:
             try:
-                self.__dict__[evt.hook].append(evt.log(kwargs["msg"], self.cluster.makespan))
+                # The events of a job are described by its signature by default
+                msg = kwargs["msg"] if "msg" in kwargs else kwargs["job"].get_signature()
+                self.__dict__[evt.hook].append(evt.log(msg, self.cluster.makespan))
             except:
                 raise RuntimeError(f"The log event specified ({evt}) doesn't exist")
 
         if evt == evts.JobStart:
             job: Job = kwargs["job"]
-            psets: list[ProcSet] = kwargs["psets"]
-            pset = reduce(lambda pA, pB: pA.union(pB), psets)
             hostname: str = kwargs["hostname"]
-            self.job_events[job.get_signature()]["submit time"] = job.submit_time
-            self.job_events[job.get_signature()]["start time"] = job.start_time
-            self.job_events[job.get_signature()]["waiting time"] = job.start_time - job.submit_time
-            self.job_events[job.get_signature()]["assigned procs"] = self.job_events[job.get_signature()]["assigned procs"].union(pset)
-            self.job_events[job.get_signature()]["hosts"].add(hostname)
+            # The cores are converted to processor sets only for the logs
+            psets: list[ProcSet] = self.cluster.hosts[hostname].to_procsets(kwargs["psets"])
+            pset = reduce(lambda pA, pB: pA.union(pB), psets)
+            jevts = self.job_events[job.job_id]
+            jevts["submit time"] = job.submit_time
+            jevts["start time"] = job.start_time
+            jevts["waiting time"] = job.start_time - job.submit_time
+            jevts["assigned procs"] = jevts["assigned procs"].union(pset)
+            jevts["hosts"].add(hostname)
 
         if evt == evts.JobFinish:
             job: Job = kwargs["job"]
-            self.job_events[job.get_signature()]["finish time"] = job.finish_time
+            self.job_events[job.job_id]["finish time"] = job.finish_time
 
         # When a log is submitted update also the values
         if evt == evts.JobStart or evt == evts.JobFinish:
@@ -83,6 +102,40 @@ class Logger(object):
                     self.cluster_events["finished jobs"][-1] = self.cluster_events["finished jobs"][-1] + 1
  
 
+    def log_job_starts(self, placements: list[tuple[Job, list]]) -> None:
+        """Log the start of a number of jobs deployed at the same time; each
+        placement is a job and its (hostname, psets) pairs
+        """
+
+        if placements == []:
+            return
+
+        # The debug logs are kept per host
+        if self.debug:
+            for job, hosts_psets in placements:
+                for hostname, psets in hosts_psets:
+                    self.log(evts.JobStart, job=job, psets=psets, hostname=hostname)
+            return
+
+        for job, hosts_psets in placements:
+            # The cores of all the hosts are converted to one processor set
+            psets = list()
+            for hostname, host_psets in hosts_psets:
+                psets.extend(self.cluster.hosts[hostname].to_procsets(host_psets))
+
+            jevts = self.job_events[job.job_id]
+            jevts["submit time"] = job.submit_time
+            jevts["start time"] = job.start_time
+            jevts["waiting time"] = job.start_time - job.submit_time
+            jevts["assigned procs"] = jevts["assigned procs"].union(union_procsets(psets))
+            jevts["hosts"].update(hostname for hostname, _ in hosts_psets)
+
+        if self.cluster_events["checkpoints"][-1] != self.cluster.makespan:
+            self.cluster_events["checkpoints"].append(self.cluster.makespan)
+            self.cluster_events["unused cores"].append(self.cluster.get_idle_cores())
+        else:
+            self.cluster_events["unused cores"][-1] = self.cluster.get_idle_cores()
+
     def setup(self):
 
         # Cluster wide events
@@ -100,27 +153,35 @@ class Logger(object):
         self.cluster_events["finished jobs"] = [0]
 
         # Events #
-        # Job events
-        self.job_events: dict[str, dict] = dict()
+        # Job events by the handle (id) of each job
+        self.job_events: dict[int, dict] = dict()
 
         # Init job events
         for job in self.database.preloaded_queue:
-            # Job events
-            jevts = {
-                    "trace": [], # [co-job, start time, end time]
-                    "speedups": [], # [sp1, sp2, ..]
-                    "cores": dict(), # {cojob1: cores1, cojob2: cores2, ..}
-                    "assigned procs": ProcSet(),
-                    "hosts": set(),
-                    "remaining time": [],
-                    "start time": 0,
-                    "finish time": 0,
-                    "submit time": 0,
-                    "waiting time": 0,
-                    "wall time": job.wall_time,
-                    "num of processes": job.num_of_processes
-            }
-            self.job_events[job.get_signature()] = jevts
+            self.init_job_events(job)
+
+    def init_job_events(self, job: Job) -> None:
+        jevts = {
+                "job name": job.job_name,
+                "trace": [], # [co-job, start time, end time]
+                "speedups": [], # [sp1, sp2, ..]
+                "cores": dict(), # {cojob1: cores1, cojob2: cores2, ..}
+                "assigned procs": ProcSet(),
+                "hosts": set(),
+                "remaining time": [],
+                "start time": 0,
+                "finish time": 0,
+                "submit time": 0,
+                "waiting time": 0,
+                "wall time": job.wall_time,
+                "num of processes": job.num_of_processes
+        }
+        self.job_events[job.job_id] = jevts
+
+    def get_job_signature(self, job_id: int) -> str:
+        """Format the signature of a job only when results are exported
+        """
+        return f"{job_id}:{self.job_events[job_id]['job name']}"
 
     def get_gantt_representation(self):
 
@@ -131,7 +192,9 @@ class Logger(object):
         # Create data for figure
         fig_data = list()
 
-        for idx, [key, jevt] in enumerate(self.job_events.items()):
+        for idx, [job_id, jevt] in enumerate(self.job_events.items()):
+
+            key = self.get_job_signature(job_id)
 
             for interval in jevt["assigned procs"].intervals():
                 x_min = jevt["start time"]
@@ -194,16 +257,16 @@ class Logger(object):
         # Boxplot points
         points = dict()
 
-        for job_sig in self.job_events:
+        for job_id in self.job_events:
 
             # Utilization numbers
             job_points = {
-                "speedup": (logger.job_events[job_sig]["finish time"] - logger.job_events[job_sig]["start time"]) / (self.job_events[job_sig]["finish time"] -self.job_events[job_sig]["start time"]),
-                "turnaround": (logger.job_events[job_sig]["finish time"] - logger.job_events[job_sig]["submit time"]) / (self.job_events[job_sig]["finish time"] -self.job_events[job_sig]["submit time"]),
-                "waiting": logger.job_events[job_sig]["waiting time"] - self.job_events[job_sig]["waiting time"]
+                "speedup": (logger.job_events[job_id]["finish time"] - logger.job_events[job_id]["start time"]) / (self.job_events[job_id]["finish time"] -self.job_events[job_id]["start time"]),
+                "turnaround": (logger.job_events[job_id]["finish time"] - logger.job_events[job_id]["submit time"]) / (self.job_events[job_id]["finish time"] -self.job_events[job_id]["submit time"]),
+                "waiting": logger.job_events[job_id]["waiting time"] - self.job_events[job_id]["waiting time"]
             }
 
-            points[job_sig] = job_points
+            points[self.get_job_signature(job_id)] = job_points
 
         return points
 
@@ -254,8 +317,8 @@ class Logger(object):
         header += "Queue Number,Partition Number,Preceding Job Number,Think Time from Preceding Job,Assigned Processors\n" # Irrelevant for us
 
         workload = ""
-        for jevt_id, jevt in self.job_events.items():
-            job_id, job_name = jevt_id.split(':')
+        for job_id, jevt in self.job_events.items():
+            job_name = jevt["job name"]
             workload += f"{job_id},"
             workload += f"{jevt['submit time']},{jevt['waiting time']},{jevt['finish time']-jevt['start time']},"
             workload += f"{len(jevt['assigned procs'])},,,"
@@ -288,10 +351,10 @@ class Logger(object):
             cluster_flat = [-100] * (num_of_hosts * ppn)
             jobnames_flat = [""] * (num_of_hosts * ppn)
 
-            for idx, [key, jevt] in enumerate(self.job_events.items()):
+            for job_id, jevt in self.job_events.items():
 
                 if jevt["start time"] <= check and jevt["finish time"] > check:
-                    idx, name = key.split(":")
+                    idx, name = job_id, jevt["job name"]
                     assigned_procs = list(jevt["assigned procs"])
                     for proc in assigned_procs:
                         cluster_flat[proc-1] = int(idx)
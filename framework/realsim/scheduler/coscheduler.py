@@ -12,6 +12,7 @@ sys.path.append(os.path.abspath(
 ))
 
 from realsim.scheduler.scheduler import Scheduler
+from realsim.cluster.host import Host
 from realsim.jobs import Job
 
 
@@ -28,30 +29,47 @@ class Coscheduler(Scheduler, ABC):
 
     @abstractmethod
     def setup(self) -> None:
-        pass
+        Scheduler.setup(self)
+
+    def corunner_stats(self, host: Host, job: Job) -> tuple[float, float, int]:
+        """The worst speedup of a job among the co-runners of a host, the
+        average speedup of the job with each co-runner and of each co-runner
+        with the job, and how many of those speedups are at least 1. The
+        results only depend on the load of the job and are cached by the host
+        until its jobs change.
+        """
+        stats = host.corunner_cache.get(job.load_index)
+
+        if stats is None:
+            speedups = self.database.speedups
+            co_loads = list(host.job_loads.values())
+
+            # An unknown speedup counts as neither a gain nor a loss, so the
+            # conditions built on these stats never sort NaN values
+            worst_speedup = speedups.row_min(job.load_index, list(host.load_counts), default=1)
+
+            speedup = speedups.pair_speedups(job.load_index, co_loads, default=1)
+            avg_speedup = float(speedup.sum()) / (len(co_loads)*2)
+            speedup_counts = int((speedup >= 1).sum())
+
+            stats = (worst_speedup, avg_speedup, speedup_counts)
+            host.corunner_cache[job.load_index] = stats
+
+        return stats
 
     def host_alloc_condition(self, hostname: str, job: Job) -> float:
         """Condition on how to sort the hosts based on the speedup that the job
         will gain/lose. Always spread first
         """
 
-        co_job_sigs = list(self.cluster.hosts[hostname].jobs.keys())
+        host = self.cluster.hosts[hostname]
 
-        # If no signatures then spread
-        if co_job_sigs == []:
+        # If no co-jobs then spread
+        if not host.job_loads:
             return job.max_speedup
 
         # Get the worst possible speedup
-        first_co_job_name = co_job_sigs[0].split(":")[-1]
-        worst_speedup = self.database.heatmap[job.job_name][first_co_job_name]
-        worst_speedup = worst_speedup if worst_speedup is not None else 1
-
-        for co_job_sig in co_job_sigs[1:]:
-            co_job_name = co_job_sig.split(":")[-1]
-            speedup = self.database.heatmap[job.job_name][co_job_name]
-            speedup = speedup if speedup is not None else 1
-            if speedup < worst_speedup:
-                worst_speedup = speedup
+        worst_speedup, _, _ = self.corunner_stats(host, job)
 
         return worst_speedup
 
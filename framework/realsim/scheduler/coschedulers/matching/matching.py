@@ -0,0 +1,229 @@
+import os
+import sys
+from collections import deque
+from math import inf
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../../"
+)))
+
+from realsim.jobs.jobs import Job
+from realsim.scheduler.coscheduler import Coscheduler
+
+
+class MatchingCoscheduler(Coscheduler):
+
+    name = "Matching Co-Scheduler"
+    description = """Co-scheduling by a global greedy matching of the first
+    waiting jobs (matching_depth, 1000 by default) with each other and with
+    the jobs executing on hosts that have room for a co-runner, weighted by
+    the average speedup of every pair; the rest of the jobs are allocated in
+    order of arrival"""
+
+    # The passes don't read the logged events of the jobs they place
+    bulk_placement = True
+
+    def __init__(self):
+
+        Coscheduler.__init__(self)
+
+        # The pairs with an average speedup above the threshold are matched
+        self.pair_threshold = 1.0
+        # How many waiting jobs, in order of arrival, take part in the
+        # matching; it bounds the cost of a pass for very deep queues
+        self.matching_depth = 1000
+
+        # Which hosts are preferred for the job that is being allocated; a
+        # (kind, value) tuple set by deploy() or None for no preference
+        self.preference = None
+
+        # The worst speedup of a load next to a set of co-loads; it only
+        # depends on the loads, so it is kept for a whole deploy
+        self.worst_speedups: dict[tuple, float] = dict()
+
+        # The average speedup of every pair of loads by their load indices;
+        # it only depends on the heatmap, so it is computed again only when
+        # the heatmap grows with an unknown load
+        self.pair_table: np.ndarray = None
+
+    def setup(self):
+        Coscheduler.setup(self)
+        self.pair_table = None
+
+    def pair_weights(self, loads: list[int], co_loads: list[int]) -> np.ndarray:
+        """The average speedup of every load with every co-load and of the
+        co-load with the load; the unknown pairs are -inf
+        """
+        values = self.database.speedups.values
+        if self.pair_table is None or self.pair_table.shape != values.shape:
+            self.pair_table = (values + values.T) / 2
+            self.pair_table[np.isnan(self.pair_table)] = -inf
+
+        return self.pair_table[np.ix_(loads, co_loads)]
+
+    def open_hosts(self) -> dict[int, list[str]]:
+        """The hosts that fit a half socket allocation next to the executing
+        jobs of a single load, by that load (co-load)
+        """
+        fitting = self.cluster.fitting_mask(self.cluster.half_socket_allocation)
+        idle = self.cluster.fitting_mask(self.cluster.socket_conf)
+
+        open_hosts: dict[int, list[str]] = dict()
+        for idx in np.flatnonzero(fitting & ~idle).tolist():
+            hostname = self.cluster.hostnames[idx]
+            load_counts = self.cluster.hosts[hostname].load_counts
+            if len(load_counts) == 1:
+                open_hosts.setdefault(next(iter(load_counts)), list()).append(hostname)
+
+        return open_hosts
+
+    def match(self) -> list[tuple]:
+        """Greedy maximum weight matching of the waiting jobs within the
+        matching depth with each other and with the open hosts. The weights
+        only depend on the loads, so they are computed for the distinct loads
+        of the waiting jobs (K) and of the open hosts (M) and every pair of
+        loads is expanded to the jobs of the loads in order of arrival.
+
+        Returns the matches by descending weight; a match is (job, co_job)
+        for two waiting jobs or (job, co_load) for a job and the open hosts
+        of a co-load.
+        """
+
+        # The waiting jobs of every load in order of arrival
+        queues: dict[int, deque[Job]] = dict()
+        for job in self.cluster.waiting_queue[:self.matching_depth]:
+            queues.setdefault(job.load_index, deque()).append(job)
+
+        if queues == dict():
+            return list()
+
+        loads = list(queues.keys())
+        open_hosts = self.open_hosts()
+        co_loads = list(open_hosts.keys())
+
+        # The weights of the pairs of waiting loads (K x K) next to the
+        # weights of the waiting loads with the co-loads (K x M)
+        weights = self.pair_weights(loads, loads + co_loads)
+        columns = weights.shape[1]
+
+        # The candidate pairs by descending weight; equal weights keep the
+        # order of arrival of the loads
+        weights = weights.ravel()
+        candidates = np.flatnonzero(weights > self.pair_threshold)
+        candidates = candidates[np.argsort(-weights[candidates], kind="stable")]
+
+        free_hosts = {co_load: len(hostnames) for co_load, hostnames in open_hosts.items()}
+
+        matches: list[tuple] = list()
+        for candidate in candidates.tolist():
+            row, col = divmod(candidate, columns)
+            queue = queues[loads[row]]
+
+            if col < len(loads):
+                # The pairs of waiting loads are symmetric
+                if col < row:
+                    continue
+
+                co_queue = queues[loads[col]]
+                while len(queue) > 0 and len(co_queue) > 0 and (col != row or len(queue) > 1):
+                    matches.append((queue.popleft(), co_queue.popleft()))
+            else:
+                co_load = co_loads[col - len(loads)]
+                while len(queue) > 0 and queue[0].half_socket_nodes <= free_hosts[co_load]:
+                    free_hosts[co_load] -= queue[0].half_socket_nodes
+                    matches.append((queue.popleft(), co_load))
+
+        return matches
+
+    def is_preferred(self, hostname: str) -> bool:
+        """The host is preferred for the job that is being allocated
+        """
+        if self.preference is None:
+            return False
+
+        kind, value = self.preference
+        if kind == "idle":
+            return self.cluster.hosts[hostname].jobs == dict()
+        elif kind == "hosts":
+            return hostname in value
+        elif kind == "co_load":
+            return value in self.cluster.hosts[hostname].load_counts
+
+        return False
+
+    def host_alloc_condition(self, hostname: str, job: Job):
+        """The preferred hosts of a match come first and then the hosts are
+        sorted as by any co-scheduler
+        """
+        host = self.cluster.hosts[hostname]
+
+        # If no co-jobs then spread
+        if not host.job_loads:
+            return (self.is_preferred(hostname), job.max_speedup)
+
+        key = (job.load_index, frozenset(host.load_counts))
+        worst_speedup = self.worst_speedups.get(key)
+        if worst_speedup is None:
+            worst_speedup = Coscheduler.host_alloc_condition(self, hostname, job)
+            self.worst_speedups[key] = worst_speedup
+
+        return (self.is_preferred(hostname), worst_speedup)
+
+    def best_hosts(self, hostnames: list[str], job: Job, k: int) -> list[str]:
+        """The preferred hosts come first, so if there are enough of them
+        only they are scored
+        """
+        if self.preference is not None:
+            preferred = [hostname for hostname in hostnames if self.is_preferred(hostname)]
+            if len(preferred) >= k:
+                hostnames = preferred
+
+        return Coscheduler.best_hosts(self, hostnames, job, k)
+
+    def deploy(self) -> bool:
+
+        deployed = False
+        self.worst_speedups = dict()
+
+        half_socket = self.cluster.half_socket_allocation
+        for job, co in self.match():
+
+            if isinstance(co, Job):
+                # The larger job of a pair goes to idle hosts and the smaller
+                # one shares its hosts
+                first, second = (job, co) if job.half_socket_nodes >= co.half_socket_nodes else (co, job)
+
+                # Most matches of a pass don't fit once the cluster fills up;
+                # they are skipped without trying the allocation
+                if self.known_no_fit(first.half_socket_nodes, half_socket):
+                    continue
+
+                self.preference = ("idle", None)
+                if self.allocation(first, half_socket):
+                    deployed = True
+
+                    self.preference = ("hosts", set(first.assigned_hosts))
+                    if self.allocation(second, half_socket):
+                        deployed = True
+            else:
+                if self.known_no_fit(job.half_socket_nodes, half_socket):
+                    continue
+
+                # Share the hosts of the jobs of the co-load
+                self.preference = ("co_load", co)
+                if self.allocation(job, half_socket):
+                    deployed = True
+
+        self.preference = None
+
+        # The jobs without a good match are allocated in order of arrival
+        for job in self.cluster.waiting_queue[:self.queue_depth]:
+
+            if self.allocation(job, self.cluster.half_socket_allocation):
+                deployed = True
+            else:
+                break
+
+        return deployed
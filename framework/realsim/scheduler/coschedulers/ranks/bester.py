@@ -3,14 +3,13 @@ from numpy.random import seed, randint
 from time import time_ns
 import os
 import sys
-from math import inf
+from math import inf, isnan
 
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), "../../../../"
 )))
 
 from realsim.jobs.jobs import Job
-from realsim.jobs.utils import deepcopy_list
 from realsim.scheduler.coschedulers.ranks.ranks import RanksCoscheduler
 from realsim.cluster.host import Host
 
@@ -21,6 +20,9 @@ class BesterCoscheduler(RanksCoscheduler):
     description = """Random co-scheduling using ranks architecture as a fallback
     to classic scheduling algorithms"""
 
+    # Every job has the same reorder key
+    static_queue_key = True
+
     def waiting_queue_reorder(self, job: Job) -> float:
         # seed(time_ns() % (2 ** 32))
         # return float(randint(len(self.cluster.waiting_queue)))
@@ -29,17 +31,14 @@ class BesterCoscheduler(RanksCoscheduler):
     def coloc_condition(self, hostname: str, job: Job) -> tuple:
 
         # Get all the executing jobs in the host
-        co_job_sigs = list(self.cluster.hosts[hostname].jobs.keys())
+        co_job_ids = list(self.cluster.hosts[hostname].jobs.keys())
 
         # If there are not then the execution will be spread and we want to
         # promote this
-        if co_job_sigs == []:
+        if co_job_ids == []:
             return (inf, inf)
 
-        co_job = None
-        for xjob in self.cluster.execution_list:
-            if xjob.get_signature() == co_job_sigs[0]:
-                co_job = xjob
+        co_job = self.cluster.jobs.get(co_job_ids[0])
 
         # This is a guard
         if co_job is None:
@@ -55,9 +54,9 @@ class BesterCoscheduler(RanksCoscheduler):
 
         # If the estimated co-run time is roughly the same and they both have
         # good avg speedup then promote
-        sp1 = self.database.heatmap[job.job_name][co_job.job_name]
-        sp2 = self.database.heatmap[co_job.job_name][job.job_name]
-        if sp1 is None or sp2 is None:
+        sp1 = self.database.speedups.speedup(job.load_index, co_job.load_index)
+        sp2 = self.database.speedups.speedup(co_job.load_index, job.load_index)
+        if isnan(sp1) or isnan(sp2):
             return (points, job.avg_speedup)
 
         avg_sp = (sp1 + sp2) / 2
@@ -73,7 +72,7 @@ class BesterCoscheduler(RanksCoscheduler):
         deployed = False
 
         # Get the backfilling candidates
-        backfilling_jobs = deepcopy_list(self.cluster.waiting_queue[1:self.backfill_depth+1])
+        backfilling_jobs = self.cluster.waiting_queue[1:self.backfill_depth+1]
 
         # Ascending sorting by their wall time
         backfilling_jobs.sort(key=lambda b_job: b_job.wall_time)
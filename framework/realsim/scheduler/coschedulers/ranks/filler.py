@@ -17,6 +17,11 @@ class FillerCoscheduler(RandomRanksCoscheduler):
     description = """Co-scheduler that tries to fill the ''holes'' 
     in the HPC system's resources created by the allocation of jobs inside"""
 
+    static_queue_key = False
+
+    def queue_key_state(self):
+        return (self.cluster.get_idle_cores(), len(self.cluster.waiting_queue))
+
     def waiting_queue_reorder(self, job: Job) -> float:
         # The job that is closer to cover the gaps is more preferrable
         sys_free_cores = self.cluster.get_idle_cores()
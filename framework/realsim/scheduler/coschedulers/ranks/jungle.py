@@ -18,6 +18,9 @@ class JungleCoscheduler(RanksCoscheduler):
     name = "Jungle Co-Scheduler"
     description = """Co-scheduling using ranks architecture to favor job avg speeedup"""
 
+    # Every job has the same reorder key
+    static_queue_key = True
+
     def waiting_queue_reorder(self, job: Job) -> float:
         # seed(time_ns() % (2 ** 32))
         # return float(randint(len(self.cluster.waiting_queue)))
@@ -28,21 +31,15 @@ class JungleCoscheduler(RanksCoscheduler):
         will gain/lose. Always spread first
         """
 
-        # get the jobs signatures that are assinged to the host
-        co_job_sigs = list(self.cluster.hosts[hostname].jobs.keys())
+        host = self.cluster.hosts[hostname]
 
-        # If no signatures then spread
-        if co_job_sigs == []:
+        # If no co-jobs then spread
+        if not host.job_loads:
             return (job.max_speedup, inf)
 
-        # get average speedup for each job in host + candidate job
-        speedup = list(map(lambda j: self.database.heatmap[job.job_name][j.split(":")[-1]],co_job_sigs))
-        speedup += list(map(lambda j: self.database.heatmap[j.split(":")[-1]][job.job_name],co_job_sigs))
-        avg_speedup = sum(speedup) / (len(co_job_sigs)*2)
-
-        # get how many of the speedup values of pairs job,x and x,job for each x in host are bellow threshold
-        jobs_with_speedup = list(filter(lambda j: self.database.heatmap[job.job_name][j.split(":")[-1]] >= 1,co_job_sigs))
-        jobs_with_speedup += list(filter(lambda j: self.database.heatmap[j.split(":")[-1]][job.job_name] >= 1,co_job_sigs))
-        speedup_counts = len(jobs_with_speedup)
+        # get average speedup for each job in host + candidate job and how
+        # many of the speedup values of pairs job,x and x,job for each x in
+        # host are not bellow threshold
+        _, avg_speedup, speedup_counts = self.corunner_stats(host, job)
 
         return (avg_speedup, speedup_counts)
@@ -17,6 +17,8 @@ class RandomRanksCoscheduler(RanksCoscheduler):
     description = """Random co-scheduling using ranks architecture as a fallback
     to classic scheduling algorithms"""
 
+    host_key_stable = True
+
     def host_alloc_condition(self, hostname: str, job: Job) -> float:
         return float(self.cluster.hosts[hostname].state != Host.IDLE)
 
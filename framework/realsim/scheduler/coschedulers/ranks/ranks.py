@@ -6,12 +6,11 @@ sys.path.append(os.path.abspath(os.path.join(
 )))
 
 from realsim.jobs.jobs import Job
-from realsim.jobs.utils import deepcopy_list
 from realsim.scheduler.coscheduler import Coscheduler
 from realsim.cluster.host import Host
 
 from abc import ABC
-from math import inf
+import numpy as np
 
 
 class RanksCoscheduler(Coscheduler, ABC):
@@ -21,40 +20,63 @@ class RanksCoscheduler(Coscheduler, ABC):
     construct. If a job reaches rank 0, then it is not capable for co-scheduling
     and is allocated for exclusive compact execution."""
 
+    # The passes don't read the logged events of the jobs they place
+    bulk_placement = True
+
     def __init__(self):
 
         Coscheduler.__init__(self)
 
-        self.ranks : dict[int, int] = dict() # jobId --> number of good pairings
+        self.ranks : dict[int, int] = dict() # load index --> number of good pairings
         self.ranks_threshold = 1.0
 
-    def update_ranks(self):
+        # good_pairs[load, co_load] is true if the average speedup of the
+        # pair of loads is above the ranks threshold
+        self.good_pairs: np.ndarray = np.zeros((0, 0), dtype=bool)
 
-        self.ranks = {job.job_id : 0 for job in self.cluster.waiting_queue}
+    def update_good_pairs(self) -> None:
+        """Precompute the good pairs of every two loads known to the database
+        """
+        values = self.database.speedups.values
+        avg_speedups = (values + values.T) / 2
 
-        # Update ranks for each job
-        for i, job in enumerate(self.cluster.waiting_queue):
+        # Pairs with unknown speedups are never good
+        self.good_pairs = avg_speedups > self.ranks_threshold
 
-            for co_job in self.cluster.waiting_queue[i+1:]:
+    def update_ranks(self):
+        """The rank of a job is the number of other jobs in the waiting queue
+        it forms a good pair with; it only depends on the load of the job, so
+        the ranks are computed per load from the histogram of the loads in
+        the waiting queue
+        """
 
-                job_speedup = self.database.heatmap[job.job_name][co_job.job_name]
-                co_job_speedup = self.database.heatmap[co_job.job_name][job.job_name]
+        # New load names were seen since the good pairs were computed
+        if len(self.good_pairs) != len(self.database.speedups.names):
+            self.update_good_pairs()
 
-                if job_speedup is None or co_job_speedup is None:
-                    continue
+        load_counts = self.cluster.waiting_queue.load_counts
+        loads = list(load_counts.keys())
+        counts = np.fromiter(load_counts.values(), dtype=np.int64, count=len(loads))
 
-                avg_speedup = (job_speedup + co_job_speedup) / 2
+        # Good pairs with every queued job except the job itself
+        good_pairs = self.good_pairs[np.ix_(loads, loads)]
+        ranks = good_pairs @ counts - np.diagonal(good_pairs)
 
-                if avg_speedup > self.ranks_threshold:
-                    self.ranks[job.job_id] += 1
-                    self.ranks[co_job.job_id] += 1
+        self.ranks = dict(zip(loads, ranks.tolist()))
+
+    def rank(self, job: Job) -> int:
+        return self.ranks.get(job.load_index, 0)
 
     def setup(self):
 
         # Whatever setup that may be
         Coscheduler.setup(self)
 
+        # The reorder keys of the waiting jobs may belong to another scheduler
+        self.cluster.waiting_queue.clear_keys()
+
         # Create ranks
+        self.update_good_pairs()
         self.update_ranks()
 
     def after_deployment(self, *args):
@@ -64,8 +86,8 @@ class RanksCoscheduler(Coscheduler, ABC):
     def compact_allocation(self, job: Job, immediate=True) -> bool:
 
         # The job is not eligible for compact execution
-        # if self.ranks[job.job_id] != 0 and job.age < self.age_threshold:
-        # if self.ranks[job.job_id] != 0:
+        # if self.rank(job) != 0 and job.age < self.age_threshold:
+        # if self.rank(job) != 0:
         #     return False
 
         return super().compact_allocation(job, immediate=immediate)
@@ -75,16 +97,10 @@ class RanksCoscheduler(Coscheduler, ABC):
         deployed = False
 
         # Update the rank of each job before scheduling them
-        # self.update_ranks()
-
-        waiting_queue = deepcopy_list(self.cluster.waiting_queue[:self.queue_depth])
-        waiting_queue.sort(key=lambda job: self.waiting_queue_reorder(job),
-                           reverse=True)
-
-        while waiting_queue != []:
+        self.update_ranks()
 
-            # Remove from the waiting queue
-            job = self.pop(waiting_queue)
+        # The jobs are removed from the waiting queue when they are deployed
+        for job in self.reordered_waiting_queue():
 
             # Colocate
             if self.allocation(job, self.cluster.half_socket_allocation):
@@ -104,40 +120,28 @@ class RanksCoscheduler(Coscheduler, ABC):
 
         blocked_job = self.cluster.waiting_queue[0]
 
-        execution_list = deepcopy_list(self.cluster.execution_list)
-        execution_list.sort(key=lambda job: job.wall_time + job.start_time - self.cluster.makespan)
-
-
-        # Get all the idle hosts
-        suitable_nodeprocs, _ = self.find_suitable_nodes(blocked_job.num_of_processes, self.cluster.half_socket_allocation)
-
-        # Get suitable hosts from names
-        suitable_hosts = list(suitable_nodeprocs.keys())
-
-        # Find the minimum estimated start time of the job
-
-        # Calculate the number of idle hosts needed
-        aggr_hosts = set(suitable_hosts)
-
-        min_estimated_time = inf
-
-        for xjob in execution_list:
-
-            aggr_hosts = aggr_hosts.union(xjob.assigned_hosts)
-
-            if len(aggr_hosts) >= blocked_job.half_socket_nodes:
-                min_estimated_time = xjob.wall_time - (self.cluster.makespan - xjob.start_time)
-                break
+        # Get the number of hosts that can fit a half socket allocation
+        suitable_hosts = self.cluster.count_fitting_hosts(self.cluster.half_socket_allocation)
 
+        # Find the minimum estimated start time of the job; the rest of the
+        # hosts become suitable when the first of their jobs ends. If there
+        # are already enough hosts the first executing job to end is used.
+        if suitable_hosts >= blocked_job.half_socket_nodes:
+            step = self.cluster.job_profile.earliest(0)
+        else:
+            step = self.cluster.host_profile.earliest(blocked_job.half_socket_nodes, suitable_hosts)
 
         # If a job couldn't reserve cores then cancel backfill at this point
-        if not min_estimated_time < inf:
+        if step is None:
             return False
 
+        xjob = self.cluster.jobs[step.item]
+        min_estimated_time = xjob.wall_time - (self.cluster.makespan - xjob.start_time)
+
         # Find job(s) that can backfill the execution list
 
         # Get the backfilling candidates
-        backfilling_jobs = deepcopy_list(self.cluster.waiting_queue[1:self.backfill_depth+1])
+        backfilling_jobs = self.cluster.waiting_queue[1:self.backfill_depth+1]
 
         # Ascending sorting by their wall time
         #backfilling_jobs.sort(key=lambda b_job: b_job.wall_time)
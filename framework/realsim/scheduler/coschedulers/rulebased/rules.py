@@ -93,7 +93,7 @@ class RulesCoscheduler(Coscheduler, ABC):
         for wjob in waiting_queue_slice:
 
             # The speedup values must exist
-            conditions  = self.database.heatmap[job.job_name][wjob.job_name] is not None
+            conditions  = self.database.heatmap[job.job_name].get(wjob.job_name) is not None
             if not conditions:
                 continue
             # The pair must fit in the remaining free processors of the cluster
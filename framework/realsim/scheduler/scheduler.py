@@ -2,7 +2,13 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 import os
 import sys
-from math import ceil
+from heapq import nlargest
+from math import ceil, inf
+from collections import namedtuple
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Optional
 
 from multiprocessing import cpu_count
 
@@ -24,6 +30,19 @@ from realsim.logger.logger import Logger
 from realsim.compengine import ComputeEngine
 
 
+# A job allocated by a scheduling pass and its (hostname, psets) pairs
+Placement = namedtuple("Placement", ["job", "hosts_psets"])
+
+
+def is_ordered(key) -> bool:
+    """A host allocation condition (number or tuple of numbers) that is not
+    and does not contain NaN
+    """
+    if isinstance(key, tuple):
+        return all(value == value for value in key)
+    return key == key
+
+
 class Scheduler(ABC):
     """Scheduler class is the abstract base class for all the scheduling
     algorithms that feed the simulation. It provides basic utility methods
@@ -38,6 +57,36 @@ class Scheduler(ABC):
 
     # Describe the philosophy of the scheduler
     description = "The abstract base class for all scheduling algorithms"
+
+    # The host allocation condition only depends on the jobs executing on a
+    # host and not on the job to be allocated; the condition of every host
+    # is then kept by the host until its jobs change
+    host_key_stable = False
+
+    # The waiting queue reorder key of a job only depends on the job (e.g.
+    # its wall time or its submit time) and is computed once when the job
+    # arrives; otherwise the keys of all the waiting jobs are computed again
+    # on every pass, or only when queue_key_state() changes if it is given.
+    # Only the schedulers whose keys are known to be static opt in.
+    static_queue_key = False
+
+    # The jobs allocated by a scheduling pass are returned as placements and
+    # the compute engine applies them in bulk (see deploy_placements()); a
+    # placed job leaves the waiting queue at once, but its start is logged
+    # only after the pass. Only the schedulers that don't read the logged
+    # events during a pass opt in.
+    bulk_placement = False
+
+    # The host allocation conditions of a big allocation are evaluated by a
+    # pool of max_workers threads over chunks of the hosts, when the hosts
+    # are at least parallel_min_hosts and scoring them serially is estimated
+    # to take at least parallel_min_time seconds; the pool is used as long as
+    # it is measured to be faster than the serial path. Only conditions that
+    # release the GIL (e.g. numpy or native code) gain from it.
+    parallel_scoring = True
+    parallel_min_hosts = 1024
+    parallel_min_time = 0.005
+
     def __init__(self):
 
         # References
@@ -51,6 +100,49 @@ class Scheduler(ABC):
         self.backfill_enabled: bool = False # The most basic algorithm will not use backfill
         self.backfill_depth = 100 # How far we reach for backfilling
 
+        # The least number of hosts that didn't fit each socket configuration
+        # at a capacity epoch of the cluster
+        self.no_fit: dict[tuple, int] = dict()
+        self.no_fit_epoch: int = -1
+
+        # The state that the waiting queue reorder keys were computed for
+        self.queue_key_state_seen = None
+
+        # The placements of the current scheduling pass if they are applied
+        # in bulk; None if every job is deployed as soon as it is allocated
+        self.placements: Optional[list[Placement]] = None
+
+        # The hosts are scored serially until setup() sets the workers
+        self.max_workers = 1
+
+        # Measured time to score a host by the serial and the parallel path;
+        # None until the path is used for a big allocation
+        self.host_score_cost: dict[str, Optional[float]] = {"serial": None, "parallel": None}
+        self.scoring_pool: Optional[ThreadPoolExecutor] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The threads of the pool can't be copied; it is created again
+        state["scoring_pool"] = None
+        return state
+
+    def find_suitable_hosts(self,
+                            req_cores: int,
+                            socket_conf: tuple,
+                            immediate=False) -> tuple[list[str], bool]:
+        """ Returns the names of the hosts that a job can use as resources and
+        if they are enough
+        + req_cores   : required cores for the job
+        + socket_conf : under a certain socket mapping/configuration
+        """
+        needed_hosts = ceil(req_cores / sum(socket_conf))
+        if immediate:
+            hostnames = self.cluster.first_fitting_hosts(socket_conf, needed_hosts)
+        else:
+            hostnames = self.cluster.first_fitting_hosts(socket_conf)
+
+        return hostnames, len(hostnames) >= needed_hosts
+
     def find_suitable_nodes(self, 
                             req_cores: int, 
                             socket_conf: tuple,
@@ -59,33 +151,137 @@ class Scheduler(ABC):
         + req_cores   : required cores for the job
         + socket_conf : under a certain socket mapping/configuration
         """
-        cores_per_host = sum(socket_conf)
-        to_be_allocated = dict()
-        for hostname, host in self.cluster.hosts.items():
-            host_sockets = host.sockets
-            # If under the specifications of the required cores and socket 
-            # allocation *takes advantage of short circuit for idle hosts
-            if host.state == Host.IDLE or all(x[0] <= len(x[1]) for x in zip(socket_conf, host.sockets)):
-                req_cores -= cores_per_host
-                # to_be_allocated.update({hostname: [
-                #     ProcSet.from_str(' '.join([str(x) for x in p_set[:socket_conf[i]]]))
-                #     for i, p_set in enumerate(host.sockets)]
-                # })
-                to_be_allocated[hostname] = [
-                    ProcSet.from_str(' '.join(map(str, p_set[:socket_conf[i]])))
-                    for i, p_set in enumerate(host_sockets)
-                ]
-                if immediate:
-                    if req_cores <= 0:
-                        return to_be_allocated, True
-
-        return to_be_allocated, req_cores <= 0
+        hostnames, req_okay = self.find_suitable_hosts(req_cores, socket_conf, immediate=immediate)
+        to_be_allocated = {
+                hostname: self.cluster.hosts[hostname].get_free_psets(socket_conf)
+                for hostname in hostnames
+        }
+
+        return to_be_allocated, req_okay
 
     def host_alloc_condition(self, hostname: str, job: Job):
         """Condition on which hosts to use first for allocation.
         """
         return 1.0
 
+    def known_no_fit(self, needed_hosts: int, socket_conf: tuple) -> bool:
+        """The cluster didn't have enough hosts for a socket configuration at
+        the current capacity epoch
+        """
+        if self.no_fit_epoch != self.cluster.capacity_epoch:
+            return False
+        return needed_hosts >= self.no_fit.get(socket_conf, inf)
+
+    def remember_no_fit(self, needed_hosts: int, socket_conf: tuple) -> None:
+        """Fewer hosts than needed fit a socket configuration; until cores are
+        returned to the cluster no more hosts can fit it
+        """
+        if self.no_fit_epoch != self.cluster.capacity_epoch:
+            self.no_fit = dict()
+            self.no_fit_epoch = self.cluster.capacity_epoch
+        self.no_fit[socket_conf] = min(needed_hosts, self.no_fit.get(socket_conf, inf))
+
+    def stable_host_alloc_condition(self, hostname: str, job: Job):
+        """The host allocation condition of a host when it is stable
+        """
+        host = self.cluster.hosts[hostname]
+        key = host.corunner_cache.get(self.name)
+
+        if key is None:
+            key = self.host_alloc_condition(hostname, job)
+            host.corunner_cache[self.name] = key
+
+        return key
+
+    def host_keys(self, hostnames: list[str], job: Job) -> list:
+        """The allocation condition of every host
+        """
+        if self.host_key_stable:
+            return [self.stable_host_alloc_condition(hostname, job) for hostname in hostnames]
+        return [self.host_alloc_condition(hostname, job) for hostname in hostnames]
+
+    def use_parallel_scoring(self, num_of_hosts: int) -> bool:
+        """Score the hosts in parallel only if it is expected to be faster
+        """
+        if not self.parallel_scoring or self.max_workers < 2 or num_of_hosts < self.parallel_min_hosts:
+            return False
+
+        serial, parallel = self.host_score_cost["serial"], self.host_score_cost["parallel"]
+        if serial is None or serial * num_of_hosts < self.parallel_min_time:
+            return False
+
+        return parallel is None or parallel < serial
+
+    def update_score_cost(self, path: str, elapsed: float, num_of_hosts: int) -> None:
+        cost = elapsed / num_of_hosts
+        previous = self.host_score_cost[path]
+        self.host_score_cost[path] = cost if previous is None else (previous + cost) / 2
+
+    def chunk_top(self, hostnames: list[str], job: Job, start: int, stop: int, k: int) -> tuple[list, list[int]]:
+        """The conditions of a chunk of the hosts and the indices of its k
+        largest conditions (all of them if they are not totally ordered)
+        """
+        keys = self.host_keys(hostnames[start:stop], job)
+        order = range(start, stop)
+
+        if k < stop - start and all(is_ordered(key) for key in keys):
+            order = nlargest(k, order, key=lambda idx: keys[idx - start])
+
+        return keys, list(order)
+
+    def parallel_host_keys(self, hostnames: list[str], job: Job, k: int) -> tuple[list, list[int]]:
+        """The conditions of the hosts evaluated over chunks by the pool and
+        the indices of the hosts that can be among the k best
+        """
+        if self.scoring_pool is None:
+            self.scoring_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        size = ceil(len(hostnames) / self.max_workers)
+        bounds = [(start, min(start + size, len(hostnames))) for start in range(0, len(hostnames), size)]
+        results = list(self.scoring_pool.map(lambda bound: self.chunk_top(hostnames, job, bound[0], bound[1], k),
+                                             bounds))
+
+        keys = [key for chunk_keys, _ in results for key in chunk_keys]
+        candidates = sorted(idx for _, chunk_order in results for idx in chunk_order)
+
+        return keys, candidates
+
+    def best_hosts(self, hostnames: list[str], job: Job, k: int) -> list[str]:
+        """The first k hosts when they are sorted by their allocation
+        condition in descending order; the hosts with equal conditions keep
+        their order
+        """
+
+        # Every host is equal under the default condition
+        if type(self).host_alloc_condition is Scheduler.host_alloc_condition:
+            return hostnames[:k]
+
+        num_of_hosts = len(hostnames)
+        timed = num_of_hosts >= self.parallel_min_hosts
+        if timed:
+            start = perf_counter()
+
+        if timed and self.use_parallel_scoring(num_of_hosts):
+            # The k best hosts are among the k best of every chunk
+            keys, order = self.parallel_host_keys(hostnames, job, k)
+            path = "parallel"
+        else:
+            keys = self.host_keys(hostnames, job)
+            order = range(num_of_hosts)
+            path = "serial"
+
+        # Selecting the k largest conditions is the same as sorting only if
+        # the conditions are totally ordered, i.e. there are no NaN values
+        if k < num_of_hosts and all(is_ordered(key) for key in keys):
+            order = nlargest(k, order, key=keys.__getitem__)
+        else:
+            order = sorted(range(num_of_hosts), key=keys.__getitem__, reverse=True)[:k]
+
+        if timed:
+            self.update_score_cost(path, perf_counter() - start, num_of_hosts)
+
+        return [hostnames[idx] for idx in order]
+
     def allocation(self, job: Job, socket_conf: tuple, immediate=False) -> bool:
         """We allocate first to the idle hosts and then to the in use hosts
         """
@@ -96,36 +292,60 @@ class Scheduler(ABC):
 
         job.socket_conf = socket_conf
 
+        # Calculate how many cores per node and the number 
+        # of nodes needed to satisfy the job
+        needed_ppn = sum(job.socket_conf)
+        needed_hosts = ceil(job.num_of_processes / needed_ppn)
+
+        # The allocation is known to fail if no cores were returned to the
+        # cluster since fewer hosts didn't fit
+        if self.known_no_fit(needed_hosts, socket_conf):
+            return False
+
         # Get only the suitable hosts
-        suitable_hosts, req_okay = self.find_suitable_nodes(job.num_of_processes, 
+        suitable_hosts, req_okay = self.find_suitable_hosts(job.num_of_processes, 
                                                             socket_conf, immediate=immediate)
 
         # If no suitable hosts where found
         if not req_okay:
+            self.remember_no_fit(needed_hosts, socket_conf)
             return False
 
         # Apply the colocation condition
-        suitable_hosts = dict(
-                sorted(suitable_hosts.items(), key=lambda it: self.host_alloc_condition(it[0], job), reverse=True)
-        )
+        chosen_hosts = self.best_hosts(suitable_hosts, job, needed_hosts)
 
-        # Calculate how many cores per node and the number 
-        # of nodes needed to satisfy the job
-        needed_ppn = sum(job.socket_conf)
-        needed_hosts = ceil(job.num_of_processes / needed_ppn)
-
-        req_hosts = needed_hosts
-        req_hosts_psets = list()
-        for hostname, psets in suitable_hosts.items():
-            req_hosts_psets.append((hostname, psets))
-            req_hosts -= 1
-            if req_hosts == 0:
-                break
+        # The processor sets are only created for the chosen hosts
+        req_hosts_psets = [
+                (hostname, self.cluster.hosts[hostname].get_free_psets(socket_conf))
+                for hostname in chosen_hosts
+        ]
 
-        self.compeng.deploy_job_to_hosts(req_hosts_psets, job)
+        if self.placements is None:
+            self.compeng.deploy_job_to_hosts(req_hosts_psets, job)
+        else:
+            self.compeng.place_job(req_hosts_psets, job)
+            self.placements.append(Placement(job, req_hosts_psets))
 
         return True
 
+    def collect_placements(self, scheduling_pass) -> list[Placement]:
+        """Run a scheduling pass and return the placements of the jobs it
+        allocated. The cores of a placed job are taken and it leaves the
+        waiting queue at once, so that the rest of the pass sees them, but
+        the job is logged when the compute engine applies the placements.
+        """
+        self.placements = list()
+        scheduling_pass()
+        placements, self.placements = self.placements, None
+
+        return placements
+
+    def deploy_placements(self) -> list[Placement]:
+        return self.collect_placements(self.deploy)
+
+    def backfill_placements(self) -> list[Placement]:
+        return self.collect_placements(self.backfill)
+
     def compact_allocation(self, job: Job, immediate=False) -> bool:
         """Compact and exclusive allocation of a job
         """
@@ -145,18 +365,62 @@ class Scheduler(ABC):
         """
         # Parallelize
         max_workers = cpu_count()
-        self.mgr_suitable_hosts = list(self.cluster.hosts.items())
-        num_of_hosts = len(self.mgr_suitable_hosts)
+        num_of_hosts = len(self.cluster.hosts)
         if num_of_hosts > max_workers:
             self.max_workers = max_workers
         else:
             self.max_workers = num_of_hosts
 
+    def teardown(self) -> None:
+        """Release the resources of the scheduler when the simulation ends
+        """
+        if self.scoring_pool is not None:
+            self.scoring_pool.shutdown()
+            self.scoring_pool = None
+
     def waiting_queue_reorder(self, job: Job) -> float:
         """How to re-order the jobs inside the waiting queue
         """
         return 1.0
 
+    def queue_key_state(self):
+        """The state of the cluster that the waiting queue reorder keys depend
+        on when they are not static; None if it is not known, then the keys
+        are computed again on every pass
+        """
+        return None
+
+    def update_queue_keys(self) -> None:
+        """Give a waiting queue reorder key to the jobs that arrived or, for
+        keys that are not static, to every waiting job if the state they
+        depend on changed
+        """
+        waiting_queue = self.cluster.waiting_queue
+
+        # The default reorder key is the same for every job
+        if self.static_queue_key or type(self).waiting_queue_reorder is Scheduler.waiting_queue_reorder:
+            for job in waiting_queue.unkeyed():
+                waiting_queue.set_key(job, self.waiting_queue_reorder(job))
+            return
+
+        state = self.queue_key_state()
+        if waiting_queue.unkeyed() != [] or state is None or state != self.queue_key_state_seen:
+            waiting_queue.set_keys((job, self.waiting_queue_reorder(job)) for job in waiting_queue)
+            self.queue_key_state_seen = state
+
+    def reordered_waiting_queue(self) -> Iterable[Job]:
+        """The jobs of the waiting queue within the queue depth by descending
+        reorder key; jobs with equal keys keep their order
+        """
+        if self.queue_depth is None:
+            self.update_queue_keys()
+            return self.cluster.waiting_queue.by_key()
+
+        waiting_queue = self.cluster.waiting_queue[:self.queue_depth]
+        waiting_queue.sort(key=lambda job: self.waiting_queue_reorder(job),
+                           reverse=True)
+        return waiting_queue
+
     @abstractmethod
     def deploy(self) -> bool:
         """Abstract method to deploy the new execution list to the cluster
@@ -1,13 +1,12 @@
 import os
 import sys
-from functools import reduce
 
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), "../../../"
 )))
 
-from realsim.cluster.host import Host
-from realsim.jobs.utils import deepcopy_list
+from realsim.cluster.profile import AvailabilityProfile
+from realsim.jobs.jobs import Job
 from realsim.scheduler.schedulers.fifo import FIFOScheduler
 from math import inf
 
@@ -21,98 +20,151 @@ class ConservativeScheduler(FIFOScheduler):
         FIFOScheduler.__init__(self)
         self.backfill_enabled = True
 
-    def reserve(self, free_slots, execution_list, blocked_job):
-
-        execution_list.sort(key=lambda job: job.wall_time + job.start_time - self.cluster.makespan)
-        min_estimated_time = inf
-        rslots = free_slots # Reservation slots
-
-        for xjob in execution_list:
-
-            rslots += xjob.assigned_hosts
-
-            if len(rslots) >= blocked_job.full_socket_nodes:
-                min_estimated_time = xjob.wall_time - (self.cluster.makespan - xjob.start_time)
-                break
-
-        # If a job couldn't reserve cores then cancel backfill at this point
-        if not min_estimated_time < inf:
-            return False
-        else:
-            execution_list.append(blocked_job)
-            free_slots -= rslots
-
-    # find_reservation([], 0, blocked_job, idle_hosts, waiting_queue, execution_list)
-
-    def find_reservation(self, reserves, start_time, blocked_job, free_slots, waiting_queue, execution_list):
-
-        if not start_time < inf:
-            return reserves
-
-        # Calculate the estimated start time of blocked job
-        execution_list.sort(key=lambda job: job.wall_time + job.start_time - self.cluster.makespan)
-        min_estimated_time = inf
-        rslots = free_slots
-        jobs_to_finish = list()
-
-        for xjob in execution_list:
-
-            rslots += xjob.assigned_hosts
-            jobs_to_finish.append(xjob)
-
-            if len(rslots) >= blocked_job.full_socket_nodes:
-                min_estimated_time = xjob.wall_time - (self.cluster.makespan - xjob.start_time)
-                break
-
-        reserves.append(start_time + min_estimated_time)
-        free_slots = [name for name in free_slots if name not in rslots]
-        
-        for xjob in execution_list:
-            xjob.remaining_time -= min_estimated_time
-        execution_list = [xjob for xjob in execution_list if xjob.remaining_time > 0]
-        execution_list.append(blocked_job)
-        
-        if waiting_queue != []:
-            blocked_job = waiting_queue[0]
+    def setup(self):
+        FIFOScheduler.setup(self)
+
+        # The hosts taken by the executing jobs until their estimated end and
+        # by the reservations of the waiting jobs
+        self.profile = AvailabilityProfile()
+        # The estimated end time of the executing jobs by their handle
+        self.executing: dict[int, float] = dict()
+        # The reserved start time of the waiting jobs by their handle
+        self.reservations: dict[int, float] = dict()
+        # A job ended before its estimated end time since the last deploy
+        self.ended_early = False
+        # The number of times jobs ended early and, by their handle, the
+        # number when each reservation was last planned; a reservation that
+        # was planned before the last early end may move earlier
+        self.early_ends = 0
+        self.planned: dict[int, int] = dict()
+
+    def reserve(self, job: Job, idle_hosts: int, latest: float = inf) -> None:
+        """Reserve the hosts of a job at the earliest time they are available
+        for its whole wall time without delaying any other reservation; a
+        reservation that is moved is never later than its previous start
+        """
+        now = self.cluster.makespan
+        start = self.profile.earliest_fit(job.full_socket_nodes, job.wall_time,
+                                          idle_hosts, now, latest)
+
+        self.reservations[job.job_id] = start
+        self.planned[job.job_id] = self.early_ends
+        if start < inf:
+            self.profile.reserve(job.job_id, start, start + job.wall_time,
+                                 job.full_socket_nodes, job.job_id, job.job_id)
+
+    def start_execution(self, job: Job) -> None:
+        """The reservation of a deployed job becomes an executing job
+        """
+        self.profile.cancel(job.job_id)
+        self.reservations.pop(job.job_id)
+        self.planned.pop(job.job_id)
+
+        end = job.start_time + job.wall_time
+        self.executing[job.job_id] = end
+        self.profile.add(job.job_id, end, len(job.assigned_hosts), job.job_id, job.job_id)
+
+    def update_reservations(self) -> None:
+        """Bring the profile up to date with the jobs that ended or arrived
+        since the last call
+        """
+
+        now = self.cluster.makespan
+        idle_hosts = self.cluster.count_idle_hosts()
+
+        # Jobs that ended; the hosts of a job that ended early are free
+        # sooner than estimated. A job that outlived its wall time has a
+        # later estimated end in the job profile; the reservations that
+        # counted on its hosts are reserved again when they fail to start.
+        for handle, end in list(self.executing.items()):
+            step = self.cluster.job_profile.get(handle)
+            if step is None:
+                if self.executing.pop(handle) > now:
+                    self.ended_early = True
+                self.profile.remove(handle)
+            elif step.time != end:
+                self.executing[handle] = step.time
+                self.profile.add(handle, step.time, step.units, handle, handle)
+
+        # Executing jobs that are not known yet (e.g. after a fork); the known
+        # ones are all in the job profile
+        if len(self.executing) < len(self.cluster.job_profile):
+            for step in self.cluster.job_profile:
+                if step.item not in self.executing:
+                    self.executing[step.item] = step.time
+                    self.profile.add(step.item, step.time, step.units, step.item, step.item)
+
+        # The reservations within the backfill depth that were planned
+        # before the last early end are moved as early as possible in the
+        # order of the waiting queue; a deeper reservation stays valid as it
+        # is and it is moved when its job enters the backfill depth
+        if self.ended_early:
+            self.early_ends += 1
+            self.ended_early = False
+
+        for job in self.cluster.waiting_queue[:self.backfill_depth+1]:
+            self.replan(job, idle_hosts)
+
+        # Jobs that arrived are reserved in the order of the waiting queue
+        if len(self.reservations) < len(self.cluster.waiting_queue):
+            for job in self.cluster.waiting_queue[len(self.reservations):]:
+                self.reserve(job, idle_hosts)
+
+    def replan(self, job: Job, idle_hosts: int) -> None:
+        """Move the reservation of a job earlier if it was planned before the
+        last early end
+        """
+        if self.planned.get(job.job_id, self.early_ends) == self.early_ends:
+            return
+
+        start = self.reservations[job.job_id]
+        if start > self.cluster.makespan:
+            self.profile.cancel(job.job_id)
+            self.reserve(job, idle_hosts, start)
         else:
-            return reserves
-        waiting_queue.remove(blocked_job)
-
-        return self.find_reservation(
-                reserves,
-                start_time + min_estimated_time,
-                blocked_job,
-                free_slots,
-                waiting_queue,
-                execution_list
-        )
+            self.planned[job.job_id] = self.early_ends
 
+    def deploy(self) -> bool:
 
-    def backfill(self) -> bool:
+        if not self.backfill_enabled:
+            return FIFOScheduler.deploy(self)
 
         deployed = False
 
-        if len(self.cluster.waiting_queue) <= 1:
-            return False
-
-        waiting_queue = deepcopy_list(self.cluster.waiting_queue[1:self.backfill_depth+1])
-        blocked_job = waiting_queue[0]
-        waiting_queue.remove(blocked_job)
-        execution_list = deepcopy_list(self.cluster.execution_list)
-
-        # Get all the idle hosts
-        idle_hosts = [host for host in list(self.cluster.hosts.values()) if host.state == Host.IDLE]
+        self.update_reservations()
+
+        # The jobs reserved to start now in the order of the waiting queue;
+        # the handles of the jobs follow the order of their arrival
+        now = self.cluster.makespan
+        starting = sorted(handle for handle, start in self.reservations.items() if start <= now)
+
+        not_started = list()
+        for handle in starting:
+            job = self.cluster.jobs[handle]
+
+            # A job can only start when its reservation starts; if there was
+            # no event at that time the job is reserved again from now on
+            if self.reservations[handle] < now:
+                self.profile.cancel(handle)
+                self.reserve(job, self.cluster.count_idle_hosts())
+                if self.reservations[handle] > now:
+                    continue
+
+            if self.compact_allocation(job):
+                self.start_execution(job)
+                deployed = True
+            else:
+                not_started.append(job)
+
+        # The estimated end of the executing jobs was too early
+        idle_hosts = self.cluster.count_idle_hosts()
+        for job in not_started:
+            self.profile.cancel(job.job_id)
+            self.reserve(job, idle_hosts)
 
-        reserves = self.find_reservation([], 0, blocked_job, idle_hosts, waiting_queue, execution_list)
-
-        # Get the backfilling candidates
-        backfilling_jobs = deepcopy_list(self.cluster.waiting_queue[1:self.backfill_depth+1])
-
-        for i, rtime in enumerate(reserves):
-
-            if backfilling_jobs[i].wall_time <= rtime:
-
-                if self.compact_allocation(backfilling_jobs[i]):
-                    deployed = True
-        
         return deployed
+
+    def backfill(self) -> bool:
+        """The jobs are backfilled by deploy() when their reservation starts
+        """
+        return False
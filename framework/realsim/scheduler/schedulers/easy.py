@@ -6,10 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), "../../../"
 )))
 
-from realsim.cluster.host import Host
-from realsim.jobs.utils import deepcopy_list
 from realsim.scheduler.schedulers.fifo import FIFOScheduler
-from math import inf
 
 
 class EASYScheduler(FIFOScheduler):
@@ -28,36 +25,24 @@ class EASYScheduler(FIFOScheduler):
         if len(self.cluster.waiting_queue) <= 1:
             return False
 
-        execution_list = deepcopy_list(self.cluster.execution_list)
-        execution_list.sort(key=lambda job: job.wall_time + job.start_time - self.cluster.makespan)
-
         blocked_job = self.cluster.waiting_queue[0]
 
-        # Get all the idle hosts
-        idle_hosts = [host for host in list(self.cluster.hosts.values()) if host.state == Host.IDLE]
-
-        # Find the minimum estimated start time of the job
-
-        # Calculate the number of idle hosts needed
-        aggr_hosts = len(idle_hosts)
-        min_estimated_time = inf
-
-        for xjob in execution_list:
-
-            aggr_hosts += len(xjob.assigned_hosts)
-
-            if aggr_hosts >= blocked_job.full_socket_nodes:
-                min_estimated_time = xjob.wall_time - (self.cluster.makespan - xjob.start_time)
-                break
+        # Find the minimum estimated start time of the job; the idle hosts
+        # and the hosts of the executing jobs that end first are enough
+        step = self.cluster.job_profile.earliest(blocked_job.full_socket_nodes,
+                                                 self.cluster.count_idle_hosts())
 
         # If a job couldn't reserve cores then cancel backfill at this point
-        if not min_estimated_time < inf:
+        if step is None:
             return False
 
+        xjob = self.cluster.jobs[step.item]
+        min_estimated_time = xjob.wall_time - (self.cluster.makespan - xjob.start_time)
+
         # Find job(s) that can backfill the execution list
 
         # Get the backfilling candidates
-        backfilling_jobs = deepcopy_list(self.cluster.waiting_queue[1:self.backfill_depth+1])
+        backfilling_jobs = self.cluster.waiting_queue[1:self.backfill_depth+1]
 
         # Scan through the rest of the jobs to see if any is fit for backfilling
         for b_job in backfilling_jobs:
@@ -6,7 +6,6 @@ sys.path.append(os.path.abspath(os.path.join(
 )))
 
 from realsim.scheduler.scheduler import Scheduler
-from realsim.jobs.utils import deepcopy_list
 
 
 class FIFOScheduler(Scheduler):
@@ -14,6 +13,9 @@ class FIFOScheduler(Scheduler):
     name = "FIFO Scheduler"
     description = "First In First Out/ First Come First Served scheduling policy"
 
+    # The passes don't read the logged events of the jobs they place
+    bulk_placement = True
+
     def __init__(self):
         Scheduler.__init__(self)
 
@@ -24,7 +26,7 @@ class FIFOScheduler(Scheduler):
     def deploy(self) -> bool:
 
         deployed = False
-        waiting_queue = deepcopy_list(self.cluster.waiting_queue[:self.queue_depth])
+        waiting_queue = self.cluster.waiting_queue[:self.queue_depth]
 
         while waiting_queue != []:
 
@@ -0,0 +1,340 @@
+import os
+import random
+import sys
+from typing import Iterable, Union
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../"
+)))
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../"
+)))
+
+from api.loader import LoadManager
+from common.utils import define_logger
+from realsim.jobs.jobs import Job
+from realsim.database import Database
+from realsim.cluster.cluster import Cluster
+from realsim.logger.logger import Logger
+from realsim.compengine import ComputeEngine
+from realsim.scheduler.scheduler import Scheduler
+from realsim.scheduler.schedulers.fifo import FIFOScheduler
+from realsim.scheduler.schedulers.easy import EASYScheduler
+from realsim.scheduler.coschedulers.ranks.bester import BesterCoscheduler
+from realsim.scheduler.coschedulers.ranks.filler import FillerCoscheduler
+from realsim.scheduler.coschedulers.ranks.jungle import JungleCoscheduler
+from realsim.scheduler.coschedulers.matching.matching import MatchingCoscheduler
+
+
+def load_manager() -> LoadManager:
+    lm = LoadManager(machine="", suite="")
+    lm.import_from_json(os.path.join(os.path.dirname(__file__), "../../pools/lm-aris.compute-NAS.json"))
+    return lm
+
+
+def workload(lm: LoadManager, count: int = 200, seed: int = 0) -> list[Job]:
+    """Jobs of random loads and sizes that arrive over time; some of them are
+    aborted because their run time is longer than their wall time
+    """
+    load_names = sorted(lm.loads)
+    rng = random.Random(seed)
+    jobs_set: list[Job] = list()
+    submit_time = 0.0
+    for _ in range(count):
+        submit_time += rng.uniform(0, 30)
+        run_time = rng.uniform(10, 500)
+        jobs_set.append(Job(None, rng.choice(load_names), rng.choice([2, 4, 8, 16, 24]), list(),
+                            run_time, submit_time, 0, run_time * rng.uniform(0.8, 2)))
+    return jobs_set
+
+
+def new_simulation(jobs_set: Union[list[Job], Iterable[Job]],
+                   lm: LoadManager,
+                   scheduler: Scheduler,
+                   backend: str = "loop",
+                   host_backend: str = "procset",
+                   lazy_hosts: bool = False) -> ComputeEngine:
+    """Set up the simulation of the jobs on 8 nodes of 2x4 cores
+    """
+    database = Database(jobs_set, lm.export_heatmap(), lm=lm)
+    database.setup()
+    cluster = Cluster(8, (4, 4), host_backend, lazy_hosts)
+    evt_logger = Logger(debug=False)
+    compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
+    compengine.debug_logger = define_logger()
+    compengine.backend = backend
+    compengine.setup_preloaded_jobs()
+
+    cluster.setup()
+    scheduler.setup()
+    evt_logger.setup()
+
+    return compengine
+
+
+def finish_simulation(compengine: ComputeEngine) -> tuple[float, list[dict]]:
+    """Run a simulation to its end and return the makespan and the events of
+    every job
+    """
+    database, cluster, evt_logger = compengine.db, compengine.cluster, compengine.logger
+    while database.preloaded_queue != [] or cluster.waiting_queue != [] or cluster.execution_list != []:
+        compengine.sim_step()
+
+    return cluster.makespan, [evt_logger.job_events[handle] for handle in sorted(evt_logger.job_events)]
+
+
+@pytest.mark.parametrize("backend", ["events", "numpy"])
+def test_backend_equals_loop_backend(backend):
+    # Co-scheduled jobs change speed when their co-runners change
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    loop_makespan, loop_events = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler(), "loop"))
+    makespan, events = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler(), backend))
+
+    assert makespan == loop_makespan
+    assert events == loop_events
+
+
+class RereadingScheduler(FIFOScheduler):
+    """Deploys one job at a time and reads the waiting queue again after
+    every placement
+    """
+
+    def deploy(self) -> bool:
+        deployed = False
+        while True:
+            for job in self.cluster.waiting_queue:
+                if self.compact_allocation(job):
+                    deployed = True
+                    break
+            else:
+                return deployed
+
+
+def test_bulk_placement_hides_placed_jobs():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    single = RereadingScheduler()
+    single.bulk_placement = False
+    bulk = RereadingScheduler()
+    bulk.bulk_placement = True
+
+    single_makespan, single_events = finish_simulation(new_simulation(jobs_set, lm, single))
+    bulk_makespan, bulk_events = finish_simulation(new_simulation(jobs_set, lm, bulk))
+
+    assert bulk_makespan == single_makespan
+    assert bulk_events == single_events
+
+
+def test_restored_snapshot_continues_the_simulation(tmp_path):
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    makespan, events = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler()))
+
+    # Snapshot in the middle of the workload and finish the restored copy
+    compengine = new_simulation(jobs_set, lm, BesterCoscheduler())
+    compengine.simulate_until(1500)
+    compengine.snapshot(str(tmp_path / "simulation.snapshot"))
+    restored = ComputeEngine.restore(str(tmp_path / "simulation.snapshot"))
+    restored.debug_logger = define_logger()
+
+    assert restored.cluster.makespan == compengine.cluster.makespan
+    assert finish_simulation(restored) == (makespan, events)
+
+
+def test_forked_simulations_continue_like_the_original():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    makespan, events = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler()))
+
+    # Fork a new scheduler from the middle of the workload; the prefix and
+    # the fork continue independently of each other
+    compengine = new_simulation(jobs_set, lm, BesterCoscheduler())
+    compengine.simulate_until(1500)
+    forked = compengine.fork(BesterCoscheduler())
+
+    assert forked.cluster.makespan == compengine.cluster.makespan
+    assert finish_simulation(forked) == (makespan, events)
+    assert finish_simulation(compengine) == (makespan, events)
+
+
+def test_streamed_jobs_equal_preloaded_jobs():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    makespan, events = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler()))
+
+    # Any iterable that is not a list is read lazily while simulating
+    stream = (job.deepcopy() for job in jobs_set)
+    compengine = new_simulation(stream, lm, BesterCoscheduler())
+
+    assert len(compengine.db.preloaded_queue) < len(jobs_set)
+    assert finish_simulation(compengine) == (makespan, events)
+
+
+def test_bitmap_hosts_equal_procset_hosts():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    procset = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler(), host_backend="procset"))
+    bitmap = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler(), host_backend="bitmap"))
+
+    assert bitmap == procset
+
+
+def test_lazy_hosts_equal_eager_hosts():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    eager = finish_simulation(new_simulation(jobs_set, lm, BesterCoscheduler(), lazy_hosts=False))
+
+    compengine = new_simulation(jobs_set, lm, BesterCoscheduler(), lazy_hosts=True)
+    lazy = finish_simulation(compengine)
+
+    assert lazy == eager
+    # The idle hosts are folded again once their jobs end
+    assert compengine.cluster.hosts.materialised == dict()
+
+
+class RankLoggingBester(BesterCoscheduler):
+    """Keeps the rank of every waiting job each time the ranks are updated
+    """
+
+    def __init__(self):
+        BesterCoscheduler.__init__(self)
+        self.rank_log: list[dict[int, int]] = list()
+
+    def update_ranks(self):
+        BesterCoscheduler.update_ranks(self)
+        self.rank_log.append({job.job_id: self.rank(job) for job in self.cluster.waiting_queue})
+
+
+class PairwiseRanksBester(RankLoggingBester):
+    """Counts the good pairs of every waiting job with each other waiting job
+    """
+
+    def update_ranks(self):
+        speedups = self.database.speedups
+        queue = list(self.cluster.waiting_queue)
+
+        ranks = dict()
+        for job in queue:
+            ranks[job.job_id] = sum(1 for co_job in queue if co_job is not job and
+                                    (speedups.speedup(job.load_index, co_job.load_index) +
+                                     speedups.speedup(co_job.load_index, job.load_index)) / 2 > self.ranks_threshold)
+        self.rank_log.append(ranks)
+
+
+def test_histogram_ranks_equal_pairwise_ranks():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    pairwise = PairwiseRanksBester()
+    histogram = RankLoggingBester()
+    pairwise_result = finish_simulation(new_simulation(jobs_set, lm, pairwise))
+    histogram_result = finish_simulation(new_simulation(jobs_set, lm, histogram))
+
+    assert histogram_result == pairwise_result
+    assert histogram.rank_log == pairwise.rank_log
+    assert any(any(ranks.values()) for ranks in histogram.rank_log)
+
+
+class FullSortHosts:
+    """Sorts all the suitable hosts of an allocation by their condition and
+    computes the condition of every host again each time
+    """
+
+    host_key_stable = False
+
+    def best_hosts(self, hostnames: list[str], job: Job, k: int) -> list[str]:
+        return sorted(hostnames, key=lambda hostname: self.host_alloc_condition(hostname, job), reverse=True)[:k]
+
+
+@pytest.mark.parametrize("scheduler_cls", [FillerCoscheduler, JungleCoscheduler])
+def test_best_hosts_equal_a_full_sort(scheduler_cls):
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    full_sort_cls = type(f"FullSort{scheduler_cls.__name__}", (FullSortHosts, scheduler_cls), dict())
+    full_sort = finish_simulation(new_simulation(jobs_set, lm, full_sort_cls()))
+    selected = finish_simulation(new_simulation(jobs_set, lm, scheduler_cls()))
+
+    assert selected == full_sort
+
+
+class NoFitMemoOff:
+    """Never knows that an allocation won't fit
+    """
+
+    def known_no_fit(self, needed_hosts: int, socket_conf: tuple) -> bool:
+        return False
+
+
+class NoFitMemoCounter:
+    """Counts the allocations that the memo knew wouldn't fit
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.no_fit_hits = 0
+
+    def known_no_fit(self, needed_hosts: int, socket_conf: tuple) -> bool:
+        known = super().known_no_fit(needed_hosts, socket_conf)
+        self.no_fit_hits += known
+        return known
+
+
+@pytest.mark.parametrize("scheduler_cls", [EASYScheduler, BesterCoscheduler, MatchingCoscheduler])
+def test_no_fit_memo_keeps_the_schedule(scheduler_cls):
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    memo_off = type(f"MemoOff{scheduler_cls.__name__}", (NoFitMemoOff, scheduler_cls), dict())()
+    memo_on = type(f"MemoOn{scheduler_cls.__name__}", (NoFitMemoCounter, scheduler_cls), dict())()
+
+    without_memo = finish_simulation(new_simulation(jobs_set, lm, memo_off))
+    with_memo = finish_simulation(new_simulation(jobs_set, lm, memo_on))
+
+    assert with_memo == without_memo
+    assert memo_on.no_fit_hits > 0
+
+
+class ParallelScoringCounter(JungleCoscheduler):
+    """Counts the allocations whose hosts were scored by the pool
+    """
+
+    def __init__(self):
+        JungleCoscheduler.__init__(self)
+        self.parallel_scorings = 0
+
+    def parallel_host_keys(self, hostnames: list[str], job: Job, k: int) -> tuple[list, list[int]]:
+        self.parallel_scorings += 1
+        return JungleCoscheduler.parallel_host_keys(self, hostnames, job, k)
+
+
+def test_parallel_scoring_equals_serial_scoring():
+    lm = load_manager()
+    jobs_set = workload(lm)
+
+    serial = JungleCoscheduler()
+    serial.parallel_scoring = False
+    serial_result = finish_simulation(new_simulation(jobs_set, lm, serial))
+
+    # Score every allocation in parallel while the pool is not measured to
+    # be slower
+    parallel = ParallelScoringCounter()
+    compengine = new_simulation(jobs_set, lm, parallel)
+    parallel.max_workers = 4
+    parallel.parallel_min_hosts = 1
+    parallel.parallel_min_time = 0
+    parallel_result = finish_simulation(compengine)
+
+    assert parallel_result == serial_result
+    assert parallel.parallel_scorings > 0
+    assert parallel.scoring_pool is None
@@ -0,0 +1,88 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../"
+)))
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../"
+)))
+
+from api.loader import LoadManager
+from common.utils import define_logger
+from realsim.jobs.jobs import Job
+from realsim.database import Database
+from realsim.cluster.cluster import Cluster
+from realsim.logger.logger import Logger
+from realsim.compengine import ComputeEngine
+from realsim.scheduler.schedulers.conservative import ConservativeScheduler
+
+
+def new_simulation(jobs: list[tuple[int, float, float]], nodes: int, backfill_depth: int,
+                   wall_time_ratio: float = 0) -> ComputeEngine:
+    """Set up the simulation of jobs of (processes, run time, wall time)
+    submitted at once on nodes of 2x2 cores
+    """
+    lm = LoadManager(machine="", suite="")
+    lm.import_from_json(os.path.join(os.path.dirname(__file__), "../../pools/lm-aris.compute-NAS.json"))
+    load_name = next(iter(lm.loads))
+
+    jobs_set = [Job(None, load_name, processes, list(), run_time, 0, 0, wall_time)
+                for processes, run_time, wall_time in jobs]
+
+    database = Database(jobs_set, lm.export_heatmap(), lm=lm)
+    database.setup()
+    cluster = Cluster(nodes, (2, 2))
+    scheduler = ConservativeScheduler()
+    scheduler.backfill_depth = backfill_depth
+    evt_logger = Logger(debug=False)
+    compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
+    compengine.debug_logger = define_logger()
+    compengine.wall_time_ratio = wall_time_ratio
+    compengine.setup_preloaded_jobs()
+
+    cluster.setup()
+    scheduler.setup()
+    evt_logger.setup()
+
+    return compengine
+
+
+def simulate(jobs: list[tuple[int, float, float]], nodes: int, backfill_depth: int,
+             wall_time_ratio: float = 0) -> list[dict]:
+    """Simulate the jobs to the end and return the events of every job in
+    order
+    """
+    compengine = new_simulation(jobs, nodes, backfill_depth, wall_time_ratio)
+    database, cluster, evt_logger = compengine.db, compengine.cluster, compengine.logger
+
+    while database.preloaded_queue != [] or cluster.waiting_queue != [] or cluster.execution_list != []:
+        compengine.sim_step()
+
+    # The handles of the jobs follow their order of submission
+    return [evt_logger.job_events[handle] for handle in sorted(evt_logger.job_events)]
+
+
+def test_deep_job_moves_earlier_after_early_end():
+    # The first job ends at 10 instead of 100; the last job is deeper than
+    # the backfill depth and was reserved after the third job, at 300
+    events = simulate([(8, 10, 100), (8, 100, 100), (8, 100, 100), (4, 10, 10)],
+                      nodes=2, backfill_depth=1)
+
+    assert [jevts["start time"] for jevts in events] == [0, 10, 110, 210]
+
+
+def test_job_past_its_wall_time_holds_its_hosts():
+    # The first job runs until 150 although its wall time ends at 100; it
+    # would be aborted at 200. When the second job ends at 120 the last job
+    # can't be reserved on the hosts of the first job.
+    jobs = [(8, 150, 100), (4, 120, 120), (8, 10, 10)]
+
+    compengine = new_simulation(jobs, nodes=3, backfill_depth=1, wall_time_ratio=1)
+    last_job = compengine.db.preloaded_queue[-1]
+    while compengine.cluster.makespan < 150:
+        compengine.sim_step()
+    assert compengine.scheduler.reservations[last_job.job_id] == 200
+
+    events = simulate(jobs, nodes=3, backfill_depth=1, wall_time_ratio=1)
+    assert [jevts["start time"] for jevts in events] == [0, 0, 150]
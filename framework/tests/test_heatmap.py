@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../"
+)))
+
+from realsim.heatmap import SpeedupMatrix
+
+
+def test_heatmap_rows_hold_only_the_known_speedups():
+    # b has no speedup next to c and c has no row of its own
+    heatmap = {
+        "a": {"a": 1.0, "b": 1.2, "c": 0.9},
+        "b": {"a": 1.1, "c": None},
+    }
+    view = SpeedupMatrix(heatmap).view()
+
+    assert dict(view).keys() == {"a", "b"}
+    assert dict(view["a"]) == {"a": 1.0, "b": 1.2, "c": 0.9}
+    assert dict(view["b"]) == {"a": 1.1}
+    assert len(view["b"]) == 1
+    assert "c" not in view["b"] and "b" not in view["b"]
+    assert view["b"].get("c") is None
+
+    for name, co_name in [("b", "c"), ("b", "b"), ("a", "d")]:
+        with pytest.raises(KeyError):
+            view[name][co_name]
+    with pytest.raises(KeyError):
+        view["c"]
+
+
+def test_unknown_speedups_take_the_default():
+    matrix = SpeedupMatrix({"a": {"a": 1.0, "b": 1.2}, "b": {"a": 0.8}})
+    a, b = matrix.index("a"), matrix.index("b")
+
+    # b has no speedup next to itself
+    assert matrix.pair_speedups(b, [a, b], default=1).tolist() == [0.8, 1.0, 1.2, 1.0]
+    assert matrix.row_min(b, [a, b], default=1) == 0.8
+    assert matrix.row_min(b, [b], default=1) == 1
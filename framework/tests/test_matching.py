@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../"
+)))
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../"
+)))
+
+from api.loader import LoadManager
+from common.utils import define_logger
+from realsim.jobs.jobs import Job
+from realsim.database import Database
+from realsim.cluster.cluster import Cluster
+from realsim.logger.logger import Logger
+from realsim.compengine import ComputeEngine
+from realsim.scheduler.coschedulers.matching.matching import MatchingCoscheduler
+
+
+def test_match_pairs_the_best_loads_in_order_of_arrival():
+    lm = LoadManager(machine="", suite="")
+    lm.import_from_json(os.path.join(os.path.dirname(__file__), "../../pools/lm-aris.compute-NAS.json"))
+    a, b, c = sorted(lm.loads)[:3]
+
+    # The average speedup of a with b is 1.5 and of a with a 1.2; c doesn't
+    # gain next to any load
+    heatmap = {
+        a: {a: 1.2, b: 1.4, c: 0.9},
+        b: {a: 1.6, b: 1.0, c: 0.8},
+        c: {a: 0.9, b: 0.8, c: 0.9},
+    }
+
+    # (load, processes) of jobs submitted at once
+    jobs_set = [Job(None, name, processes, list(), 100, 0, 0, 100)
+                for name, processes in [(a, 8), (c, 4), (b, 4), (a, 4), (a, 4)]]
+
+    database = Database(jobs_set, heatmap, lm=lm)
+    database.setup()
+    cluster = Cluster(4, (4, 4))
+    scheduler = MatchingCoscheduler()
+    evt_logger = Logger(debug=False)
+    compengine = ComputeEngine(database, cluster, scheduler, evt_logger)
+    compengine.debug_logger = define_logger()
+    compengine.setup_preloaded_jobs()
+
+    cluster.setup()
+    scheduler.setup()
+    evt_logger.setup()
+
+    compengine.load_in_waiting_queue()
+    a1, c1, b1, a2, a3 = cluster.waiting_queue
+
+    # Nothing executes, so there are no hosts to share
+    assert scheduler.match() == [(a1, b1), (a2, a3)]
+
+    # The larger job of a pair goes first and the other one shares its hosts
+    scheduler.deploy()
+    assert set(b1.assigned_hosts) <= set(a1.assigned_hosts)
+    assert a2.assigned_hosts == a3.assigned_hosts
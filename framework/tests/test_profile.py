@@ -0,0 +1,74 @@
+import os
+import random
+import sys
+from math import inf
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../"
+)))
+
+from realsim.cluster.profile import AvailabilityProfile
+
+
+def level(steps, free, time):
+    return free + sum(step.units for step in steps if step.time <= time)
+
+
+def reference_earliest(steps, units, free):
+    released = free
+    for step in steps:
+        released += step.units
+        if released >= units:
+            return step
+    return None
+
+
+def reference_earliest_fit(steps, units, duration, free, now, latest):
+    times = sorted({step.time for step in steps if step.time > now})
+
+    def fits(start):
+        return level(steps, free, start) >= units and all(
+            level(steps, free, time) >= units for time in times if start < time < start + duration)
+
+    if fits(now):
+        return now
+    if now >= latest:
+        return latest
+    for start in times:
+        if start > latest:
+            break
+        if fits(start):
+            return start
+    return latest
+
+
+def test_profile_queries_match_a_scan_of_the_steps():
+    rng = random.Random(0)
+
+    # Job ends release units; reservations take units for a while. The
+    # times are few so that many steps share a time.
+    released = AvailabilityProfile()
+    reserved = AvailabilityProfile()
+    for seq in range(2000):
+        entry_id = rng.randrange(100)
+        if rng.random() < 0.3:
+            released.remove(entry_id)
+            reserved.cancel(entry_id)
+        else:
+            start = float(rng.randrange(50))
+            released.add(entry_id, start, rng.randint(1, 4), entry_id, seq)
+            reserved.reserve(entry_id, start, start + rng.randrange(1, 20), rng.randint(1, 4), entry_id, seq)
+
+        released_steps = sorted(released.entries.values())
+        reserved_steps = sorted(reserved.entries.values())
+        assert list(released) == released_steps
+        assert list(reserved) == reserved_steps
+
+        units, free = rng.randint(0, 40), rng.randint(0, 5)
+        assert released.earliest(units, free) == reference_earliest(released_steps, units, free)
+
+        units, duration, free = rng.randint(1, 8), float(rng.randrange(1, 30)), rng.randint(0, 8)
+        now = float(rng.randrange(30))
+        latest = rng.choice([inf, now + rng.randrange(30)])
+        assert reserved.earliest_fit(units, duration, free, now, latest) == \
+            reference_earliest_fit(reserved_steps, units, duration, free, now, latest)
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../"
+)))
+
+from realsim.jobs.jobs import Job
+from realsim.jobs.utils import WaitingQueue
+
+
+def make_jobs(num_of_jobs: int) -> list[Job]:
+    return [Job(job_id, f"job{job_id}", 1, list(), 10, 0, 0, 10) for job_id in range(num_of_jobs)]
+
+
+def test_by_key_orders_by_key_then_arrival():
+    jobs = make_jobs(4)
+    queue = WaitingQueue(jobs)
+    for job, key in zip(jobs, [1.0, 2.0, 1.0, 2.0]):
+        queue.set_key(job, key)
+
+    assert [job.job_id for job in queue.by_key()] == [1, 3, 0, 2]
+
+
+def test_rekeyed_job_is_yielded_once():
+    jobs = make_jobs(3)
+    queue = WaitingQueue(jobs)
+    for job in jobs:
+        queue.set_key(job, 1.0)
+
+    # A -> B -> A leaves two heap entries with the key A for the job
+    queue.set_key(jobs[0], 2.0)
+    queue.set_key(jobs[0], 3.0)
+    queue.set_key(jobs[0], 2.0)
+
+    assert [job.job_id for job in queue.by_key()] == [0, 1, 2]
+
+
+def test_removed_job_is_skipped():
+    jobs = make_jobs(3)
+    queue = WaitingQueue(jobs)
+    for job in jobs:
+        queue.set_key(job, 1.0)
+
+    queue.remove(jobs[1])
+
+    assert [job.job_id for job in queue.by_key()] == [0, 2]